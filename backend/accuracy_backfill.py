@@ -0,0 +1,262 @@
+# accuracy_backfill.py
+"""
+Incremental forecast-accuracy backfill.
+
+Actual consumption lands in forecast_actuals, either synced from the
+`materials` table (matched to forecasts by project name) or imported from
+a CSV file; imported rows take priority and are never overwritten by the
+materials sync. A row is flagged dirty whenever its actual_qty changes and
+the flag is cleared only once accuracy was computed for that exact
+quantity, so each run recomputes only changed forecasts, and a write that
+commits while a run is in progress is picked up by the next run (no
+timestamp watermark to race against). Accuracy is computed with NumPy over
+a whole chunk at once:
+
+    per material: 100 * (1 - |predicted - actual| / |actual|), clipped to 0..100
+    per forecast: mean of its material accuracies
+
+Run from the backend folder:  python accuracy_backfill.py [--actuals file.csv]
+"""
+import argparse
+import csv
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import and_, bindparam, func, literal, or_, select, true, update
+
+import response_cache
+from database import SessionLocal
+from models import (
+    Forecast,
+    ForecastActual,
+    ForecastMaterial,
+    ForecastResultMaterial,
+    JobWatermark,
+    Material,
+    Project,
+)
+
+JOB_NAME = "accuracy_backfill"
+CHUNK_FORECASTS = 1000
+IMPORT_BATCH = 5000
+
+
+def _upsert_actuals(db, rows_or_select, keep_imported: bool = False):
+    """
+    INSERT ... ON CONFLICT DO UPDATE, touching only rows whose quantity changed.
+    keep_imported=True (materials sync) leaves rows that came from an import alone;
+    an import always claims the row, even when the quantity is unchanged.
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    cols = ["forecast_id", "material_name", "actual_qty", "source", "updated_at", "dirty"]
+    stmt = insert(ForecastActual)
+    if not isinstance(rows_or_select, list):
+        stmt = stmt.from_select(cols, rows_or_select)
+    changed = ForecastActual.actual_qty != stmt.excluded.actual_qty
+    not_imported = func.coalesce(ForecastActual.source, "") != "import"
+    changed = and_(changed, not_imported) if keep_imported else or_(changed, not_imported)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["forecast_id", "material_name"],
+        set_={
+            "actual_qty": stmt.excluded.actual_qty,
+            "source": stmt.excluded.source,
+            "updated_at": stmt.excluded.updated_at,
+            "dirty": 1,
+        },
+        where=changed,
+    )
+    if isinstance(rows_or_select, list):
+        return db.connection().execute(stmt, rows_or_select).rowcount
+    return db.execute(stmt).rowcount
+
+
+def sync_from_materials(db) -> int:
+    """Actuals = summed `materials` quantities of the project the forecast names."""
+    actuals = (
+        select(
+            Forecast.id,
+            Material.material_name,
+            func.sum(Material.quantity),
+            literal("materials"),
+            literal(datetime.utcnow()),
+            literal(1),
+        )
+        .join(Project, Project.name == Forecast.project_name)
+        .join(Material, Material.project_id == Project.id)
+        .where(true())
+        .group_by(Forecast.id, Material.material_name)
+    )
+    changed = _upsert_actuals(db, actuals, keep_imported=True)
+    db.commit()
+    return changed
+
+
+def import_actuals(db, lines) -> int:
+    """
+    Import actuals from CSV lines with columns
+    forecast_id (or project_name), material_name, actual_qty.
+    """
+    reader = csv.DictReader(lines)
+    names = {}
+    changed, batch = 0, []
+
+    def forecast_ids(row):
+        if row.get("forecast_id"):
+            return [int(row["forecast_id"])]
+        name = row["project_name"]
+        if name not in names:
+            names[name] = [
+                fid for (fid,) in db.query(Forecast.id).filter(Forecast.project_name == name)
+            ]
+        return names[name]
+
+    for row in reader:
+        for fid in forecast_ids(row):
+            batch.append({
+                "forecast_id": fid,
+                "material_name": row["material_name"],
+                "actual_qty": float(row["actual_qty"]),
+                "source": "import",
+                "updated_at": datetime.utcnow(),
+                "dirty": 1,
+            })
+        if len(batch) >= IMPORT_BATCH:
+            changed += _upsert_actuals(db, batch)
+            batch = []
+    if batch:
+        changed += _upsert_actuals(db, batch)
+    db.commit()
+    return changed
+
+
+def material_accuracy(predicted: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    error = np.abs(predicted - actual)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acc = 100.0 * (1.0 - error / np.abs(actual))
+    acc = np.where(actual == 0, np.where(error == 0, 100.0, 0.0), acc)
+    return np.clip(acc, 0.0, 100.0)  # NaN (no prediction for this material) stays NaN
+
+
+def _score_chunk(db, forecast_ids) -> int:
+    # predicted quantity lives in forecast_materials (legacy) or the shared result
+    rows = db.execute(
+        select(
+            ForecastActual.id,
+            ForecastActual.forecast_id,
+            ForecastActual.actual_qty,
+            func.coalesce(ForecastMaterial.predicted_qty, ForecastResultMaterial.predicted_qty),
+        )
+        .join(Forecast, Forecast.id == ForecastActual.forecast_id)
+        .outerjoin(
+            ForecastMaterial,
+            and_(
+                ForecastMaterial.forecast_id == ForecastActual.forecast_id,
+                ForecastMaterial.material_name == ForecastActual.material_name,
+            ),
+        )
+        .outerjoin(
+            ForecastResultMaterial,
+            and_(
+                ForecastResultMaterial.result_id == Forecast.result_id,
+                ForecastResultMaterial.material_name == ForecastActual.material_name,
+            ),
+        )
+        .where(ForecastActual.forecast_id.in_(forecast_ids))
+    ).all()
+    if not rows:
+        return 0
+
+    ids, fids, actual, predicted = (np.array(col) for col in zip(*rows))
+    actual = actual.astype(np.float64)
+    predicted = np.array([np.nan if p is None else p for p in predicted], dtype=np.float64)
+    acc = material_accuracy(predicted, actual)
+
+    # group by forecast: mean accuracy over scored materials, summed actual qty
+    uniq, codes = np.unique(fids, return_inverse=True)
+    scored = ~np.isnan(acc)
+    n_scored = np.bincount(codes, weights=scored, minlength=len(uniq))
+    acc_sum = np.bincount(codes, weights=np.where(scored, acc, 0.0), minlength=len(uniq))
+    actual_sum = np.bincount(codes, weights=actual, minlength=len(uniq))
+    with np.errstate(invalid="ignore"):
+        overall = acc_sum / n_scored
+
+    # clear the dirty flag only if actual_qty is still the value just scored;
+    # a concurrent change keeps the row dirty for the next run
+    table = ForecastActual.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.actual_qty == bindparam("b_qty"))
+        .values(accuracy=bindparam("b_acc"), dirty=None),
+        [
+            {"b_id": int(i), "b_qty": float(q), "b_acc": None if np.isnan(a) else float(a)}
+            for i, q, a in zip(ids, actual, acc)
+        ],
+    )
+    db.execute(
+        update(Forecast),
+        [
+            {
+                "id": int(f),
+                "accuracy": None if np.isnan(o) else round(float(o), 2),
+                "actual_qty": float(q),
+            }
+            for f, o, q in zip(uniq, overall, actual_sum)
+        ],
+    )
+    db.commit()
+    return len(uniq)
+
+
+def _drop_legacy_watermark(db):
+    """
+    Databases scored by the old updated_at watermark may have missed rows that
+    committed behind it: rescore everything once and retire the watermark.
+    """
+    mark = db.get(JobWatermark, JOB_NAME)
+    if mark is None:
+        return
+    db.execute(update(ForecastActual).values(dirty=1))
+    db.delete(mark)
+    db.commit()
+
+
+def run(db, sync_materials: bool = True) -> dict:
+    synced = sync_from_materials(db) if sync_materials else 0
+    _drop_legacy_watermark(db)
+
+    forecast_ids = [
+        fid for (fid,) in db.execute(
+            select(ForecastActual.forecast_id)
+            .where(ForecastActual.dirty == 1)
+            .distinct()
+            .order_by(ForecastActual.forecast_id)
+        )
+    ]
+
+    scored = 0
+    for start in range(0, len(forecast_ids), CHUNK_FORECASTS):
+        scored += _score_chunk(db, forecast_ids[start:start + CHUNK_FORECASTS])
+
+    if scored:
+        response_cache.invalidate(response_cache.FORECASTS)
+    return {"synced": synced, "forecastsScored": scored}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill forecast accuracy from actuals")
+    parser.add_argument("--actuals", help="CSV: forecast_id|project_name, material_name, actual_qty")
+    parser.add_argument("--no-materials", action="store_true", help="skip syncing actuals from the materials table")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.actuals:
+            with open(args.actuals, newline="") as fh:
+                print("Imported actuals:", import_actuals(db, fh))
+        print(run(db, sync_materials=not args.no_materials))
+    finally:
+        db.close()
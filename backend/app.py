@@ -1,8 +1,14 @@
 # app.py
+import os
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import Base, engine
+from database import missing_schema, sync_schema
+import inference
+import profiling
+import save_queue
 from routes import (
     auth_routes,
     project_routes,
@@ -10,11 +16,15 @@ from routes import (
     prediction_routes,
     forecast,  # <-- main ML + save + fetch routes
     dashboard_routes,          # ✅ ADD THIS
-    project_list_routes        # ✅ ADD THIS
+    project_list_routes,       # ✅ ADD THIS
+    admin_routes,
+    search_routes,
+    event_routes,
 )
 
-# Auto-create tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by `python create_tables.py` (run before starting the
+# server), not at import time. SIH_AUTO_MIGRATE=1 runs it on startup instead;
+# otherwise startup refuses an out-of-date database rather than serving 500s.
 
 app = FastAPI(title="SIH Backend + ML API")
 
@@ -25,8 +35,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # custom response headers are invisible to cross-origin JS unless exposed
+    expose_headers=[
+        "X-Total-Count",                # /materials/summary paging
+        "Retry-After",                  # rate limiting
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-Profile-Id",                 # request profiling
+    ],
 )
 
+# Request profiling (SIH_PROFILING=1); not installed at all when off
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 # -------------------
 # ROUTE REGISTRATIONS
 # -------------------
@@ -37,6 +59,31 @@ app.include_router(prediction_routes.router)    # historical prediction logs
 app.include_router(forecast.router)  
 app.include_router(dashboard_routes.router)
 app.include_router(project_list_routes.router)           # ML prediction + save route
+app.include_router(admin_routes.router)         # limiter metrics, stored profiles
+app.include_router(search_routes.router)        # full-text search
+app.include_router(event_routes.router)         # live dashboard updates (SSE)
+
+@app.on_event("startup")
+def optional_startup_work():
+    if os.getenv("SIH_AUTO_MIGRATE") == "1":
+        sync_schema()
+    missing = missing_schema()
+    if missing:
+        raise RuntimeError(
+            f"Database schema is out of date (missing: {', '.join(missing[:10])}"
+            f"{', ...' if len(missing) > 10 else ''}). Run `python create_tables.py` first."
+        )
+    # warm the ML stack off the request path instead of on the first prediction
+    if os.getenv("SIH_PRELOAD_MODEL") == "1":
+        threading.Thread(target=inference.load, name="model-preload", daemon=True).start()
+
+
+@app.on_event("startup")
+def resume_pending_saves():
+    # finish async /forecast/save jobs left over from a previous run
+    if save_queue.has_pending():
+        save_queue.start()
+
 
 @app.get("/")
 def root():
@@ -0,0 +1,187 @@
+# archive.py
+"""
+Hot/cold archival of old forecasts.
+
+Forecasts older than the retention age (SIH_ARCHIVE_AFTER_DAYS, default 365)
+are written, with their materials and actuals, to gzip-compressed NDJSON
+partitions, one per creation month (SIH_ARCHIVE_DIR/forecasts-YYYY-MM.jsonl.gz),
+and then deleted from the hot tables. Shared results no longer referenced by
+any hot forecast are dropped as well.
+
+A partition is appended and fsynced before the rows are deleted, so a crash
+can at worst archive a forecast twice; readers de-duplicate by id.
+
+Run from the backend folder:  python archive.py [--days 365] [--vacuum]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text
+
+import response_cache
+from database import SessionLocal
+from models import (
+    Forecast,
+    ForecastActual,
+    ForecastMaterial,
+    ForecastResult,
+    ForecastResultMaterial,
+)
+
+ARCHIVE_DIR = os.getenv("SIH_ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("SIH_ARCHIVE_AFTER_DAYS", "365"))
+BATCH_SIZE = 500
+
+_FORECAST_COLUMNS = [c.name for c in Forecast.__table__.columns]
+
+
+def _partition_path(created_at: datetime) -> str:
+    return os.path.join(ARCHIVE_DIR, f"forecasts-{created_at:%Y-%m}.jsonl.gz")
+
+
+def _materials_by_forecast(db, forecasts) -> dict:
+    """Material rows for a batch of forecasts, in two queries (legacy + shared)."""
+    ids = [f.id for f in forecasts]
+    by_forecast = defaultdict(list)
+    for m in (
+        db.query(ForecastMaterial)
+        .filter(ForecastMaterial.forecast_id.in_(ids))
+        .order_by(ForecastMaterial.id)
+    ):
+        by_forecast[m.forecast_id].append(m)
+
+    result_ids = {f.result_id for f in forecasts if f.result_id is not None}
+    by_result = defaultdict(list)
+    if result_ids:
+        for m in (
+            db.query(ForecastResultMaterial)
+            .filter(ForecastResultMaterial.result_id.in_(result_ids))
+            .order_by(ForecastResultMaterial.id)
+        ):
+            by_result[m.result_id].append(m)
+
+    return {
+        f.id: [
+            {
+                "name": m.material_name,
+                "quantity": m.predicted_qty,
+                "unit": m.unit,
+                "unitCost": m.unit_cost,
+                "totalCost": m.total_cost,
+            }
+            for m in (by_result[f.result_id] if f.result_id is not None else by_forecast[f.id])
+        ]
+        for f in forecasts
+    }
+
+
+def _actuals_by_forecast(db, ids) -> dict:
+    by_forecast = defaultdict(list)
+    for a in db.query(ForecastActual).filter(ForecastActual.forecast_id.in_(ids)):
+        by_forecast[a.forecast_id].append(
+            {"material_name": a.material_name, "actual_qty": a.actual_qty, "accuracy": a.accuracy}
+        )
+    return by_forecast
+
+
+def _record(forecast, materials, actuals) -> dict:
+    record = {}
+    for name in _FORECAST_COLUMNS:
+        value = getattr(forecast, name)
+        record[name] = value.isoformat() if isinstance(value, datetime) else value
+    record["materials"] = materials
+    record["actuals"] = actuals
+    return record
+
+
+def _append(path: str, records: list[dict]):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(path, "ab") as raw:
+        # each append is its own gzip member; readers see one continuous stream
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for record in records:
+                gz.write((json.dumps(record) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_old(db, older_than_days: int = ARCHIVE_AFTER_DAYS) -> dict:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived, partitions = 0, set()
+
+    while True:
+        forecasts = (
+            db.query(Forecast)
+            .filter(Forecast.created_at < cutoff)
+            .order_by(Forecast.id)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not forecasts:
+            break
+        ids = [f.id for f in forecasts]
+        materials = _materials_by_forecast(db, forecasts)
+        actuals = _actuals_by_forecast(db, ids)
+
+        by_partition = defaultdict(list)
+        for f in forecasts:
+            by_partition[_partition_path(f.created_at)].append(_record(f, materials[f.id], actuals[f.id]))
+        for path, records in by_partition.items():
+            _append(path, records)
+            partitions.add(os.path.basename(path))
+
+        db.execute(delete(ForecastActual).where(ForecastActual.forecast_id.in_(ids)))
+        db.execute(delete(ForecastMaterial).where(ForecastMaterial.forecast_id.in_(ids)))
+        db.execute(delete(Forecast).where(Forecast.id.in_(ids)))
+        db.commit()
+        archived += len(ids)
+
+    orphaned = select(ForecastResult.id).where(
+        ~ForecastResult.id.in_(select(Forecast.result_id).where(Forecast.result_id.is_not(None)))
+    )
+    db.execute(delete(ForecastResultMaterial).where(ForecastResultMaterial.result_id.in_(orphaned)))
+    results_dropped = db.execute(delete(ForecastResult).where(ForecastResult.id.in_(orphaned))).rowcount
+    db.commit()
+    if archived:
+        response_cache.invalidate(response_cache.FORECASTS)
+
+    return {
+        "archived": archived,
+        "resultsDropped": results_dropped,
+        "cutoff": cutoff.isoformat(),
+        "partitions": sorted(partitions),
+    }
+
+
+def read_archived(exclude_ids=()):
+    """Archived forecast records, newest partition first, de-duplicated by id."""
+    seen = set(exclude_ids)
+    for path in sorted(glob.glob(os.path.join(ARCHIVE_DIR, "forecasts-*.jsonl.gz")), reverse=True):
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            records = [json.loads(line) for line in fh if line.strip()]
+        for record in sorted(records, key=lambda r: r["id"], reverse=True):
+            if record["id"] in seen:
+                continue
+            seen.add(record["id"])
+            yield record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old forecasts into monthly compressed partitions")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive forecasts older than this")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages (SQLite)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(archive_old(db, args.days))
+        if args.vacuum and db.bind.dialect.name == "sqlite":
+            with db.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+    finally:
+        db.close()
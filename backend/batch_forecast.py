@@ -0,0 +1,276 @@
+# batch_forecast.py
+"""
+Offline batch forecasting for planning spreadsheets.
+
+    python batch_forecast.py projects.csv -o forecasts.csv [--jobs 8] [--save]
+
+Reads a CSV (or .parquet) with the ForecastInput columns, predicts chunks on
+a process pool (each worker loads the model once, in its initializer, and
+predicts single-threaded so N workers use N cores), costs every row with the
+current price catalog exactly like /forecast/save, and writes .csv, .jsonl
+or .parquet depending on the output extension. --save also stores the rows
+as forecasts with forecast_store.persist_many (shared content-addressed
+results, one bulk transaction per --commit-every rows); re-running the same
+file does not duplicate them.
+
+Run from the backend folder.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pydantic import ValidationError
+
+import inference
+import price_catalog
+from schemas import ForecastInput
+
+CHUNK_ROWS = 512
+COMMIT_EVERY = 1000
+
+
+# ---------------------------------------------------------------- workers
+def _init_worker():
+    model, _ = inference.load()
+    if model is None:
+        raise RuntimeError("ML model not loaded")
+    # parallelism comes from the pool; estimators fitted with n_jobs=-1 would oversubscribe
+    for _, step in getattr(model, "steps", [("model", model)]):
+        if hasattr(step, "n_jobs"):
+            step.n_jobs = 1
+    try:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _predict_chunk(rows):
+    return inference.predict(rows)
+
+
+# ---------------------------------------------------------------- io
+def read_inputs(path: str):
+    """Yield (row number, ForecastInput | error message)."""
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        yield from _validate(pd.read_parquet(path).to_dict("records"))
+    else:
+        with open(path, newline="") as fh:
+            yield from _validate(csv.DictReader(fh))
+
+
+def _validate(records):
+    for number, record in enumerate(records, start=1):
+        try:
+            yield number, ForecastInput(**{k: v for k, v in record.items() if v not in ("", None)})
+        except ValidationError as exc:
+            yield number, "; ".join(
+                f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()
+            )
+
+
+class _Writer:
+    """Streams result rows to .csv / .jsonl; .parquet is written at close."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.kind = os.path.splitext(path)[1].lstrip(".") or "csv"
+        self._rows = []
+        self._fh = None if self.kind == "parquet" else open(path, "w", newline="")
+        self._csv = None
+        if self.kind == "csv":
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(
+                ["row", "project_name", "location", "subtotal", "gst", "total", *price_catalog.MATERIAL_NAMES]
+            )
+
+    def write(self, result: dict):
+        if self.kind == "csv":
+            self._csv.writerow([
+                result["row"], result["projectName"], result["location"],
+                result["subtotal"], result["gst"], result["total"], *result["quantities"],
+            ])
+        elif self.kind == "parquet":
+            self._rows.append(result)
+        else:
+            self._fh.write(json.dumps(result) + "\n")
+
+    def close(self):
+        if self.kind == "parquet":
+            import pandas as pd
+
+            pd.DataFrame(self._rows).to_parquet(self.path)
+        else:
+            self._fh.close()
+
+
+# ---------------------------------------------------------------- saving
+def _record(body: ForecastInput, quantities, prices, model_version, key):
+    import forecast_store
+
+    # same costing as /forecast/save
+    materials, subtotal, gst, total = prices.costed_materials(quantities)
+    features = body.model_dump(include=set(inference.INPUT_FEATURES))
+    return {
+        "fields": {**features, "location": body.location, "project_name": body.project_name or "Unknown"},
+        "materials": materials,
+        "subtotal": subtotal,
+        "gst": gst,
+        "total": total,
+        "price_version": prices.version,
+        "content_hash": forecast_store.content_hash(features, model_version, prices.version),
+        "model_version": model_version,
+        "idempotency_key": key,
+    }
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+# ---------------------------------------------------------------- driver
+def _chunks(inputs, size, errors):
+    chunk = []
+    for number, item in inputs:
+        if isinstance(item, str):
+            errors.append({"row": number, "error": item})
+            continue
+        chunk.append((number, item))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Sink:
+    """Costs predicted chunks, writes them out and (optionally) bulk-stores them."""
+
+    def __init__(self, writer, prices, model_version, db=None, key_prefix=None, commit_every=COMMIT_EVERY):
+        self.writer = writer
+        self.prices = prices
+        self.model_version = model_version
+        self.db = db
+        self.key_prefix = key_prefix
+        self.commit_every = commit_every
+        self.written = 0
+        self.saved = 0
+        self._pending = []
+
+    def add(self, chunk, quantities):
+        _, subtotal, gst, total = self.prices.cost(quantities)
+        for i, (number, body) in enumerate(chunk):
+            self.writer.write({
+                "row": number,
+                "projectName": body.project_name,
+                "location": body.location,
+                "quantities": quantities[i].tolist(),
+                "subtotal": float(subtotal[i]),
+                "gst": float(gst[i]),
+                "total": float(total[i]),
+            })
+            self.written += 1
+            if self.db is None:
+                continue
+            self._pending.append(_record(
+                body, quantities[i], self.prices, self.model_version, f"{self.key_prefix}{number}",
+            ))
+            if len(self._pending) >= self.commit_every:
+                self.commit()
+
+    def commit(self):
+        from forecast_store import persist_many
+
+        if self.db is not None and self._pending:
+            self.saved += persist_many(self.db, self._pending)
+            self.db.commit()
+            self._pending = []
+
+
+def run(input_path, output_path, jobs=None, chunk_rows=CHUNK_ROWS, save=False, commit_every=COMMIT_EVERY):
+    started = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    errors = []
+
+    db = None
+    if save:
+        from database import SessionLocal
+
+        db = SessionLocal()
+    prices = price_catalog.current()
+    sink = _Sink(
+        _Writer(output_path),
+        prices,
+        inference.model_version(),
+        db=db,
+        key_prefix=f"batch:{_file_digest(input_path)}:" if save else None,
+        commit_every=commit_every,
+    )
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            # at most 2 chunks per worker in flight, so memory stays flat for huge files
+            in_flight = []
+            for chunk in _chunks(read_inputs(input_path), chunk_rows, errors):
+                rows = [body.model_dump(include=set(inference.INPUT_FEATURES)) for _, body in chunk]
+                in_flight.append((chunk, pool.submit(_predict_chunk, rows)))
+                if len(in_flight) >= jobs * 2:
+                    done, future = in_flight.pop(0)
+                    sink.add(done, future.result())
+            for done, future in in_flight:
+                sink.add(done, future.result())
+        sink.commit()
+        if db is not None:
+            import response_cache
+
+            response_cache.invalidate(response_cache.FORECASTS)
+    finally:
+        sink.writer.close()
+        if db is not None:
+            db.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": sink.written,
+        "saved": sink.saved,
+        "errors": errors,
+        "jobs": jobs,
+        "priceVersion": prices.version,
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": round(sink.written / seconds, 1) if seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast every row of a CSV/Parquet file")
+    parser.add_argument("input", help="CSV or .parquet with ForecastInput columns")
+    parser.add_argument("-o", "--output", default="forecasts_out.csv", help=".csv, .jsonl or .parquet")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--save", action="store_true", help="also store the forecasts in the database")
+    parser.add_argument("--commit-every", type=int, default=COMMIT_EVERY)
+    args = parser.parse_args()
+
+    summary = run(
+        args.input,
+        args.output,
+        jobs=args.jobs,
+        chunk_rows=args.chunk_rows,
+        save=args.save,
+        commit_every=args.commit_every,
+    )
+    for error in summary["errors"][:20]:
+        print(f"⚠️ row {error['row']}: {error['error']}", file=sys.stderr)
+    summary["errors"] = len(summary["errors"])
+    print(json.dumps(summary, indent=2))
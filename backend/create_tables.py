@@ -1,8 +1,8 @@
 # create_tables.py
-from database import engine, Base
+from database import sync_schema
 import models  # noqa: F401 (needed so models are registered)
 
 if __name__ == "__main__":
     print("Creating tables in sih.db ...")
-    Base.metadata.create_all(bind=engine)
+    sync_schema()
     print("✅ Tables created successfully!")
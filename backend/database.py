@@ -1,12 +1,14 @@
 # database.py
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./sih.db"
+DATABASE_URL = os.getenv("SIH_DATABASE_URL", "sqlite:///./sih.db")
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,3 +23,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ensure_indexes(bind=engine):
+    """
+    create_all() only builds indexes together with new tables, so indexes
+    added to models later never reach an existing sih.db. Create any that
+    are missing.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def add_missing_columns(bind=engine):
+    """
+    Add nullable columns that exist on the models but not yet in the database
+    (create_all never alters existing tables).
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+
+
+def sync_schema(bind=engine):
+    """Create missing tables, columns, indexes and the search index."""
+    import models  # noqa: F401 (registers the tables on Base)
+    import search_index
+
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    ensure_indexes(bind)
+    search_index.ensure(bind)
+
+
+def missing_schema(bind=engine) -> list[str]:
+    """
+    Tables / columns the models expect but the database lacks (one inspector
+    round trip), e.g. ["forecast_results", "forecasts.result_id"].
+    """
+    import models  # noqa: F401 (registers the tables on Base)
+
+    present = {
+        table: {c["name"] for c in columns}
+        for (_, table), columns in inspect(bind).get_multi_columns().items()
+    }
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in present:
+            missing.append(table.name)
+            continue
+        missing += [f"{table.name}.{c.name}" for c in table.columns if c.name not in present[table.name]]
+    if bind.dialect.name == "sqlite" and "search_index" not in present:
+        missing.append("search_index")
+    return missing
@@ -0,0 +1,122 @@
+# events.py
+"""
+In-process event fan-out for live dashboard updates (served as SSE by
+routes/event_routes.py).
+
+publish() may be called from any thread (sync routes run in the threadpool,
+the save queue has its own writer thread). Each event is serialized once and
+handed to every subscriber's asyncio queue via call_soon_threadsafe, so one
+worker can serve many open tabs without touching the DB. A subscriber that
+falls QUEUE_MAX events behind gets its backlog replaced by a single
+"resync" event (refetch everything) instead of slowing the publisher.
+
+Recent events are kept in a small ring buffer so a reconnecting client
+(Last-Event-ID) only receives what it missed. Events are per worker; with
+several workers each tab sees the writes handled by the worker it is
+connected to, plus a "resync" whenever its history is insufficient.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+QUEUE_MAX = 256
+HISTORY = 512
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_subscribers = set()
+_history = deque(maxlen=HISTORY)
+_last_id = 0
+_skipped_after = None   # newest event id when a publisher last skipped a delta
+
+
+class Subscription:
+    def __init__(self, loop, types=None):
+        self.loop = loop
+        self.types = set(types) if types else None
+        self.queue = asyncio.Queue(maxsize=QUEUE_MAX)
+
+    def wants(self, event_type: str) -> bool:
+        return self.types is None or event_type in self.types or event_type == "resync"
+
+    def offer(self, message):
+        # runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_message("resync", {}))
+
+
+def _message(event_type: str, data: dict, event_id: int | None = None):
+    payload = json.dumps({"type": event_type, "data": data, "at": datetime.utcnow().isoformat()}, default=str)
+    return event_id, event_type, payload
+
+
+def publish(event_type: str, data: dict):
+    """Broadcast one delta; cheap no-op when nobody is listening."""
+    global _last_id
+    with _lock:
+        _last_id = next(_ids)
+        message = _message(event_type, data, _last_id)
+        _history.append(message)
+        targets = [s for s in _subscribers if s.wants(event_type)]
+    for sub in targets:
+        try:
+            sub.loop.call_soon_threadsafe(sub.offer, message)
+        except RuntimeError:  # loop already closed; the stream's finally removes it
+            pass
+
+
+def subscribe(types=None, last_event_id: int | None = None) -> Subscription:
+    """Register a subscriber on the running loop, replaying events after last_event_id."""
+    sub = Subscription(asyncio.get_running_loop(), types)
+    with _lock:
+        if last_event_id is not None:
+            oldest = _history[0][0] if _history else None
+            newest = _history[-1][0] if _history else 0
+            missed_skipped = _skipped_after is not None and last_event_id <= _skipped_after
+            if missed_skipped or last_event_id > newest or (oldest is not None and last_event_id < oldest - 1):
+                # history rolled over, the id is from before a restart, or a
+                # delta was skipped while this client was disconnected
+                sub.offer(_message("resync", {}))
+            else:
+                for message in _history:
+                    if message[0] > last_event_id and sub.wants(message[1]):
+                        sub.offer(message)
+        _subscribers.add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscription):
+    with _lock:
+        _subscribers.discard(sub)
+
+
+def listening() -> bool:
+    """
+    Whether anyone is subscribed, so publishers can skip building costly
+    payloads. A skip is remembered: clients reconnecting from before it get
+    a resync, since the delta never reached the history.
+    """
+    global _skipped_after
+    with _lock:
+        if _subscribers:
+            return True
+        _skipped_after = _last_id
+        return False
+
+
+def subscriber_count() -> int:
+    with _lock:
+        return len(_subscribers)
+
+
+def format_sse(message) -> str:
+    event_id, event_type, payload = message
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {payload}\n\n"
@@ -0,0 +1,295 @@
+# forecast_store.py
+"""
+Persistence for saved forecasts, shared by the synchronous /forecast/save
+path and the write-behind queue (save_queue.py).
+
+Material results are content-addressed: forecasts with the same model
+inputs, model version and price version share one forecast_results row
+(and its ~132 forecast_result_materials rows) instead of each writing its
+own copy. Forecasts saved before that keep their rows in forecast_materials;
+material_rows() reads both.
+"""
+import hashlib
+import json
+
+from sqlalchemy import insert, select, union_all
+
+from models import Forecast, ForecastMaterial, ForecastResult, ForecastResultMaterial
+
+HASHED_FEATURES = (
+    "project_category_main",
+    "project_type",
+    "project_budget_price_in_lake",
+    "state",
+    "terrain",
+    "distance_from_storage_unit",
+    "transmission_line_length_km",
+)
+
+
+def content_hash(features: dict, model_version: str, price_version: int) -> str:
+    payload = {
+        "features": {
+            k: float(features[k]) if isinstance(features[k], (int, float)) else str(features[k])
+            for k in HASHED_FEATURES
+        },
+        "model": model_version,
+        "prices": price_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def find_result(db, digest: str):
+    return db.query(ForecastResult).filter(ForecastResult.content_hash == digest).first()
+
+
+def find_by_idempotency_key(db, key: str):
+    return db.query(Forecast).filter(Forecast.idempotency_key == key).first()
+
+
+def result_materials(db, result_id: int) -> list[dict]:
+    """Materials array (frontend shape) of a stored result, in model output order."""
+    rows = (
+        db.query(ForecastResultMaterial)
+        .filter(ForecastResultMaterial.result_id == result_id)
+        .order_by(ForecastResultMaterial.id)
+    )
+    return [_material_dict(m) for m in rows]
+
+
+def forecast_materials(db, forecast: Forecast) -> list[dict]:
+    if forecast.result_id is not None:
+        return result_materials(db, forecast.result_id)
+    rows = (
+        db.query(ForecastMaterial)
+        .filter(ForecastMaterial.forecast_id == forecast.id)
+        .order_by(ForecastMaterial.id)
+    )
+    return [_material_dict(m) for m in rows]
+
+
+def _material_dict(m) -> dict:
+    return {
+        "name": m.material_name,
+        "quantity": m.predicted_qty,
+        "unit": m.unit,
+        "unitCost": m.unit_cost,
+        "totalCost": m.total_cost,
+    }
+
+
+def _get_or_create_result(db, record: dict) -> ForecastResult:
+    result = find_result(db, record["content_hash"])
+    if result is not None:
+        return result
+
+    result = ForecastResult(
+        content_hash=record["content_hash"],
+        model_version=record.get("model_version"),
+        price_version=record["price_version"],
+        subtotal=record["subtotal"],
+        gst=record["gst"],
+        total=record["total"],
+    )
+    db.add(result)
+    db.flush()
+    db.execute(
+        insert(ForecastResultMaterial),
+        [
+            {
+                "result_id": result.id,
+                "material_name": item["name"],
+                "predicted_qty": item["quantity"],
+                "unit": item["unit"],
+                "unit_cost": item["unitCost"],
+                "total_cost": item["totalCost"],
+            }
+            for item in record["materials"]
+        ],
+    )
+    return result
+
+
+def persist_forecast(db, record: dict) -> Forecast:
+    """
+    Add one costed forecast to the session and return it. The caller commits,
+    so many records can share a transaction.
+
+    record = {"fields": {...Forecast columns...}, "materials": [...],
+              "subtotal", "gst", "total", "price_version",
+              "content_hash", "model_version", "idempotency_key"}
+
+    A record whose idempotency_key was already saved returns that forecast.
+    """
+    key = record.get("idempotency_key")
+    if key:
+        existing = find_by_idempotency_key(db, key)
+        if existing is not None:
+            return existing
+
+    fields = record["fields"]
+    entry = Forecast(
+        **fields,
+        budget=fields["project_budget_price_in_lake"],
+        subtotal=record["subtotal"],
+        gst=record["gst"],
+        total=record["total"],
+        price_version=record["price_version"],
+        idempotency_key=key,
+    )
+
+    if "content_hash" in record:
+        entry.result_id = _get_or_create_result(db, record).id
+        db.add(entry)
+        db.flush()
+        return entry
+
+    # records queued before results were content-addressed
+    db.add(entry)
+    db.flush()
+    db.execute(
+        insert(ForecastMaterial),
+        [
+            {
+                "forecast_id": entry.id,
+                "material_name": item["name"],
+                "predicted_qty": item["quantity"],
+                "unit": item["unit"],
+                "unit_cost": item["unitCost"],
+                "total_cost": item["totalCost"],
+            }
+            for item in record["materials"]
+        ],
+    )
+    return entry
+
+
+def forecast_event(entry: Forecast) -> dict:
+    """Compact delta published on events when a forecast is saved."""
+    return {
+        "id": entry.id,
+        "projectName": entry.project_name,
+        "state": entry.state,
+        "location": entry.location,
+        "total": entry.total,
+        "status": entry.status,
+    }
+
+
+def persist_many(db, records: list[dict]) -> int:
+    """
+    Bulk variant of persist_forecast for offline loads: a fixed number of
+    statements per call instead of several per record. Records must be
+    content-addressed (carry content_hash). Records whose idempotency_key is
+    already stored are skipped. Returns the number of forecasts inserted;
+    the caller commits.
+    """
+    keys = {r["idempotency_key"] for r in records if r.get("idempotency_key")}
+    if keys:
+        stored = db.execute(
+            select(Forecast.idempotency_key).where(Forecast.idempotency_key.in_(keys))
+        ).scalars()
+        keys -= set(stored)
+    fresh, taken = [], set()
+    for record in records:
+        key = record.get("idempotency_key")
+        if key and (key not in keys or key in taken):
+            continue
+        taken.add(key)
+        fresh.append(record)
+    if not fresh:
+        return 0
+
+    hashes = {r["content_hash"] for r in fresh}
+    result_ids = dict(db.execute(
+        select(ForecastResult.content_hash, ForecastResult.id).where(ForecastResult.content_hash.in_(hashes))
+    ).all())
+    new_results = {}
+    for record in fresh:
+        if record["content_hash"] not in result_ids:
+            new_results.setdefault(record["content_hash"], record)
+    if new_results:
+        inserted = db.execute(
+            insert(ForecastResult).returning(ForecastResult.content_hash, ForecastResult.id),
+            [
+                {
+                    "content_hash": digest,
+                    "model_version": r.get("model_version"),
+                    "price_version": r["price_version"],
+                    "subtotal": r["subtotal"],
+                    "gst": r["gst"],
+                    "total": r["total"],
+                }
+                for digest, r in new_results.items()
+            ],
+        ).all()
+        result_ids.update(dict(inserted))
+        db.execute(
+            insert(ForecastResultMaterial),
+            [
+                {
+                    "result_id": result_ids[digest],
+                    "material_name": item["name"],
+                    "predicted_qty": item["quantity"],
+                    "unit": item["unit"],
+                    "unit_cost": item["unitCost"],
+                    "total_cost": item["totalCost"],
+                }
+                for digest, r in new_results.items()
+                for item in r["materials"]
+            ],
+        )
+
+    db.execute(
+        insert(Forecast),
+        [
+            {
+                **r["fields"],
+                "budget": r["fields"]["project_budget_price_in_lake"],
+                "subtotal": r["subtotal"],
+                "gst": r["gst"],
+                "total": r["total"],
+                "price_version": r["price_version"],
+                "result_id": result_ids[r["content_hash"]],
+                "idempotency_key": r.get("idempotency_key"),
+            }
+            for r in fresh
+        ],
+    )
+    return len(fresh)
+
+
+def material_rows(*forecast_columns, where=()):
+    """
+    Per-forecast material rows from both storage layouts as one subquery:
+    forecast_id, material_name, predicted_qty, unit_cost, total_cost plus the
+    requested Forecast columns (labelled by name). `where` filters on Forecast
+    /material_name are applied inside each branch so indexes stay usable.
+    """
+    extra = [c.label(c.key) for c in forecast_columns]
+
+    legacy = (
+        select(
+            ForecastMaterial.forecast_id.label("forecast_id"),
+            ForecastMaterial.material_name.label("material_name"),
+            ForecastMaterial.predicted_qty.label("predicted_qty"),
+            ForecastMaterial.unit_cost.label("unit_cost"),
+            ForecastMaterial.total_cost.label("total_cost"),
+            *extra,
+        )
+        .join(Forecast, Forecast.id == ForecastMaterial.forecast_id)
+        .where(*[w(ForecastMaterial) for w in where])
+    )
+    shared = (
+        select(
+            Forecast.id.label("forecast_id"),
+            ForecastResultMaterial.material_name.label("material_name"),
+            ForecastResultMaterial.predicted_qty.label("predicted_qty"),
+            ForecastResultMaterial.unit_cost.label("unit_cost"),
+            ForecastResultMaterial.total_cost.label("total_cost"),
+            *extra,
+        )
+        .join(ForecastResultMaterial, ForecastResultMaterial.result_id == Forecast.result_id)
+        .where(*[w(ForecastResultMaterial) for w in where])
+    )
+    return union_all(legacy, shared).subquery("material_rows")
@@ -0,0 +1,104 @@
+# inference.py
+"""
+Lazy access to the material model + target scaler.
+
+joblib / pandas / sklearn are imported on the first prediction rather than
+at import time, so the app can start (and serve DB-only routes) without
+paying for the ML stack.
+"""
+import hashlib
+import os
+import threading
+
+MODEL_PATH = os.getenv("SIH_MODEL_PATH", "Balanced_Material_Model.pkl")
+SCALER_PATH = os.getenv("SIH_SCALER_PATH", "Balanced_YScaler.pkl")
+
+INPUT_FEATURES = [
+    "project_category_main",
+    "project_type",
+    "project_budget_price_in_lake",
+    "state",
+    "terrain",
+    "distance_from_storage_unit",
+    "transmission_line_length_km",
+]
+
+_model = None
+_y_scaler = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def load():
+    """Load model + scaler once. Returns (model, y_scaler); (None, None) if loading failed."""
+    global _model, _y_scaler, _loaded
+    if _loaded:
+        return _model, _y_scaler
+    with _lock:
+        if not _loaded:
+            import joblib
+
+            try:
+                _model = joblib.load(MODEL_PATH)
+                _y_scaler = joblib.load(SCALER_PATH)
+                print("✅ ML Model + Scaler Loaded")
+            except Exception:
+                _model, _y_scaler = None, None
+                print("⚠️ MODEL LOAD FAILED — Check file paths")
+            _loaded = True
+    return _model, _y_scaler
+
+
+def model_version() -> str:
+    """
+    Fingerprint of the model + scaler files on disk (size and mtime), cheap
+    enough to call per request and changes whenever the artifacts are replaced.
+    """
+    return fingerprint(MODEL_PATH, SCALER_PATH)
+
+
+def fingerprint(*paths) -> str:
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_size}-{int(st.st_mtime)}")
+        except OSError:
+            parts.append("missing")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+def features_frame(rows):
+    """DataFrame in the column layout the saved pipeline was fitted on."""
+    import pandas as pd
+
+    return pd.DataFrame([
+        {
+            "project_category_main": row["project_category_main"],
+            "project_type": row["project_type"],
+            "project_budget_price_in_lake": row["project_budget_price_in_lake"],
+            "state": row["state"],
+            "terrain": row["terrain"],
+
+            # canonical API / DB field (keep this)
+            "distance_from_storage_unit": row["distance_from_storage_unit"],
+
+            # legacy/model compatibility column (exact name expected by saved pipeline)
+            "Distance_from_Storage_unit": row["distance_from_storage_unit"],
+
+            "transmission_line_length_km": row["transmission_line_length_km"],
+        }
+        for row in rows
+    ])
+
+
+def predict(rows):
+    """Predicted quantities, shape (len(rows), 132), in original units."""
+    model, y_scaler = load()
+    if model is None:
+        raise RuntimeError("ML model not loaded")
+    return predict_with(model, y_scaler, rows)
+
+
+def predict_with(model, y_scaler, rows):
+    return y_scaler.inverse_transform(model.predict(features_frame(rows)))
@@ -1,19 +1,50 @@
-import joblib
+import os
+import threading
+
 import numpy as np
 
-model = joblib.load("forecast_model.pkl")
+import inference
+
+MODEL_PATH = os.getenv("SIH_COST_MODEL_PATH", "forecast_model.pkl")
+
+# column order the cost model was fitted on
+COST_FEATURES = ["budget", "line_length", "region", "project_type", "tower_type", "substation_type"]
+
+_model = None
+_version = None
+_lock = threading.Lock()
+
+
+def model_version() -> str:
+    return inference.fingerprint(MODEL_PATH)
+
+
+def get_model():
+    # loaded on first use so importing this module stays cheap; reloaded when the file is replaced
+    global _model, _version
+    version = model_version()
+    if _model is None or version != _version:
+        with _lock:
+            if _model is None or version != _version:
+                import joblib
+
+                _model = joblib.load(MODEL_PATH)
+                _version = version
+    return _model
+
+
+def _value(data, name):
+    return data.get(name) if isinstance(data, dict) else getattr(data, name, None)
+
+
+def predict_cost_batch(rows) -> np.ndarray:
+    """(material_cost, labour_cost, total_cost) per row, shape (len(rows), 3), one model call."""
+    input_data = np.array([[_value(row, name) for name in COST_FEATURES] for row in rows])
+    return np.asarray(get_model().predict(input_data), dtype=float).reshape(len(rows), -1)
+
 
 def predict_cost(data):
-    input_data = np.array([[
-        data.budget,
-        data.line_length,
-        data.region,
-        data.project_type,
-        data.tower_type,
-        data.substation_type
-    ]])
-
-    prediction = model.predict(input_data)[0]
+    prediction = predict_cost_batch([data])[0]
     return {
         "material_cost": float(prediction[0]),
         "labour_cost": float(prediction[1]),
@@ -1,6 +1,6 @@
 # models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -52,6 +52,21 @@ class Material(Base):
 
     project = relationship("Project", back_populates="materials")
 
+    __table_args__ = (
+        Index("ix_materials_name_project", "material_name", "project_id", "quantity", "cost"),
+        Index("ix_materials_project", "project_id", "quantity", "cost"),
+    )
+
+
+# ---------- MATERIAL THRESHOLD (reorder levels for /materials/summary) ----------
+class MaterialThreshold(Base):
+    __tablename__ = "material_thresholds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    material_name = Column(String, unique=True, nullable=False, index=True)
+    reorder_level = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 # ---------- PREDICTION (optional, for future) ----------
 class Prediction(Base):
@@ -59,11 +74,21 @@ class Prediction(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    predicted_cost = Column(Float, nullable=False)
+    predicted_cost = Column(Float, nullable=False)   # total cost
+    material_cost = Column(Float, nullable=True)
+    labour_cost = Column(Float, nullable=True)
+    # inputs not stored on the project, reused when re-scoring
+    tower_type = Column(String, nullable=True)
+    substation_type = Column(String, nullable=True)
+    model_version = Column(String, nullable=True)    # ml_engine.model_version() at scoring time
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="predictions")
 
+    __table_args__ = (
+        Index("ix_predictions_project_id", "project_id", "id"),
+    )
+
 
 # ---------- FORECAST (linked to ML model inputs) ----------
 class Forecast(Base):
@@ -92,12 +117,29 @@ class Forecast(Base):
 
     # cost fields
     budget = Column(Float, nullable=True)  # Actual budget value
+    subtotal = Column(Float, nullable=True)
+    gst = Column(Float, nullable=True)
     total = Column(Float, nullable=True)   # Estimated cost including GST
+    price_version = Column(Integer, nullable=True)  # price catalog version used for costs
+
+    # shared, content-addressed material result (legacy rows use forecast_materials)
+    result_id = Column(Integer, ForeignKey("forecast_results.id"), nullable=True)
+    idempotency_key = Column(String, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # relationship to forecast materials
     forecast_materials = relationship("ForecastMaterial", back_populates="forecast")
+    result = relationship("ForecastResult")
+
+    __table_args__ = (
+        # filters/group-bys used by /forecast/aggregate
+        Index("ix_forecasts_state_category_created", "state", "project_category_main", "created_at"),
+        Index("ix_forecasts_created_at", "created_at"),
+        Index("ix_forecasts_price_version", "price_version"),
+        Index("ix_forecasts_result_id", "result_id"),
+        Index("ix_forecasts_idempotency_key", "idempotency_key", unique=True),
+    )
 
 
 # ---------- FORECAST MATERIAL ----------
@@ -113,3 +155,130 @@ class ForecastMaterial(Base):
     total_cost = Column(Float, nullable=True)
 
     forecast = relationship("Forecast", back_populates="forecast_materials")
+
+    __table_args__ = (
+        # covering index: aggregates never need to touch the table rows
+        Index(
+            "ix_forecast_materials_forecast_material",
+            "forecast_id", "material_name", "predicted_qty", "total_cost",
+        ),
+    )
+
+
+# ---------- FORECAST RESULT (one per distinct model input, shared by forecasts) ----------
+class ForecastResult(Base):
+    __tablename__ = "forecast_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 of the 7 model features + model version + price version
+    content_hash = Column(String, nullable=False, unique=True, index=True)
+    model_version = Column(String, nullable=True)
+    price_version = Column(Integer, nullable=True)
+    subtotal = Column(Float, nullable=True)
+    gst = Column(Float, nullable=True)
+    total = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    materials = relationship("ForecastResultMaterial", back_populates="result")
+
+
+class ForecastResultMaterial(Base):
+    __tablename__ = "forecast_result_materials"
+
+    id = Column(Integer, primary_key=True, index=True)
+    result_id = Column(Integer, ForeignKey("forecast_results.id"), nullable=False)
+    material_name = Column(String, nullable=False)
+    predicted_qty = Column(Float, nullable=False)
+    unit = Column(String, nullable=True, default="units")
+    unit_cost = Column(Float, nullable=True)
+    total_cost = Column(Float, nullable=True)
+
+    result = relationship("ForecastResult", back_populates="materials")
+
+    __table_args__ = (
+        Index(
+            "ix_forecast_result_materials_result_material",
+            "result_id", "material_name", "predicted_qty", "total_cost",
+        ),
+    )
+
+
+# ---------- PRICE CATALOG (versioned unit prices) ----------
+class PriceCatalogVersion(Base):
+    __tablename__ = "price_catalog_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    items = relationship("PriceCatalogItem", back_populates="version")
+
+
+class PriceCatalogItem(Base):
+    __tablename__ = "price_catalog_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    version_id = Column(Integer, ForeignKey("price_catalog_versions.id"), nullable=False)
+    material_name = Column(String, nullable=False)
+    unit_price = Column(Float, nullable=False)
+
+    version = relationship("PriceCatalogVersion", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_price_catalog_items_version_material", "version_id", "material_name", "unit_price", unique=True),
+    )
+
+
+# ---------- FORECAST ACTUALS (observed consumption, for accuracy) ----------
+class ForecastActual(Base):
+    __tablename__ = "forecast_actuals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    forecast_id = Column(Integer, ForeignKey("forecasts.id"), nullable=False)
+    material_name = Column(String, nullable=False)
+    actual_qty = Column(Float, nullable=False)
+    accuracy = Column(Float, nullable=True)       # per-material accuracy (%)
+    source = Column(String, nullable=True)        # "materials" | "import" (imports take priority)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # set only when actual_qty changes
+    dirty = Column(Integer, nullable=True)        # 1 = actual_qty changed since accuracy was computed
+
+    __table_args__ = (
+        Index("ix_forecast_actuals_forecast_material", "forecast_id", "material_name", unique=True),
+        Index("ix_forecast_actuals_updated_at", "updated_at", "forecast_id"),
+        Index("ix_forecast_actuals_dirty", "dirty", "forecast_id"),
+    )
+
+
+# ---------- JOB WATERMARKS (incremental background jobs) ----------
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    name = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ---------- SHADOW MODEL EVALUATIONS ----------
+class ShadowEvaluation(Base):
+    """
+    One live request replayed against the candidate model. Per-material
+    deltas (shadow - primary) are a packed float32 array, 4 bytes/material.
+    """
+    __tablename__ = "shadow_evaluations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)            # "predict" | "save"
+    shadow_version = Column(String, nullable=False)
+    primary_version = Column(String, nullable=False)
+    mae = Column(Float, nullable=False)
+    max_abs_delta = Column(Float, nullable=False)
+    max_delta_material = Column(String, nullable=True)
+    primary_total = Column(Float, nullable=True)
+    shadow_total = Column(Float, nullable=True)
+    deltas = Column(LargeBinary, nullable=False)
+    latency_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_shadow_evaluations_version_created", "shadow_version", "created_at"),
+    )
@@ -0,0 +1,120 @@
+# prediction_rescore.py
+"""
+Re-score every project with the project-level cost model (ml_engine).
+
+Runs only when forecast_model.pkl changed since the last run (its
+fingerprint is kept in job_watermarks), unless forced. Projects are read in
+keyset-paginated chunks together with the tower/substation inputs of their
+latest prediction; each chunk is one vectorized model call and one bulk
+INSERT of new Prediction rows, so history is kept and "latest" moves.
+
+Run from the backend folder:  python prediction_rescore.py [--force]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+import ml_engine
+from database import SessionLocal
+from models import JobWatermark, Prediction, Project
+
+JOB_NAME = "prediction_rescore"
+CHUNK_PROJECTS = 5000
+
+
+def _latest_inputs(db, project_ids) -> dict:
+    latest = (
+        select(func.max(Prediction.id))
+        .where(Prediction.project_id.in_(project_ids))
+        .group_by(Prediction.project_id)
+    )
+    return {
+        project_id: (tower_type, substation_type)
+        for project_id, tower_type, substation_type in db.execute(
+            select(Prediction.project_id, Prediction.tower_type, Prediction.substation_type)
+            .where(Prediction.id.in_(latest))
+        )
+    }
+
+
+def _score_chunk(db, projects, version: str) -> int:
+    inputs = _latest_inputs(db, [p.id for p in projects])
+    rows = []
+    for p in projects:
+        tower_type, substation_type = inputs.get(p.id, (None, None))
+        rows.append({
+            "budget": p.budget,
+            "line_length": p.line_length,
+            "region": p.region,
+            "project_type": p.project_type,
+            "tower_type": tower_type,
+            "substation_type": substation_type,
+        })
+    costs = ml_engine.predict_cost_batch(rows)
+
+    now = datetime.utcnow()
+    db.execute(
+        insert(Prediction),
+        [
+            {
+                "project_id": p.id,
+                "material_cost": float(cost[0]),
+                "labour_cost": float(cost[1]),
+                "predicted_cost": float(cost[2]),
+                "tower_type": row["tower_type"],
+                "substation_type": row["substation_type"],
+                "model_version": version,
+                "created_at": now,
+            }
+            for p, row, cost in zip(projects, rows, costs)
+        ],
+    )
+    db.commit()
+    return len(projects)
+
+
+def run(db, force: bool = False) -> dict:
+    started = time.perf_counter()
+    version = ml_engine.model_version()
+    mark = db.get(JobWatermark, JOB_NAME)
+    if not force and mark is not None and mark.value == version:
+        return {"modelVersion": version, "projectsScored": 0, "skipped": True}
+
+    ml_engine.get_model()  # fail before touching any chunk if the model can't load
+    scored, last_id = 0, 0
+    while True:
+        projects = db.execute(
+            select(Project.id, Project.budget, Project.line_length, Project.region, Project.project_type)
+            .where(Project.id > last_id)
+            .order_by(Project.id)
+            .limit(CHUNK_PROJECTS)
+        ).all()
+        if not projects:
+            break
+        scored += _score_chunk(db, projects, version)
+        last_id = projects[-1].id
+
+    mark = mark or JobWatermark(name=JOB_NAME)
+    mark.value = version
+    db.add(mark)
+    db.commit()
+    return {
+        "modelVersion": version,
+        "projectsScored": scored,
+        "skipped": False,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score all projects with the cost model")
+    parser.add_argument("--force", action="store_true", help="re-score even if the model is unchanged")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(run(db, force=args.force))
+    finally:
+        db.close()
@@ -0,0 +1,346 @@
+# price_catalog.py
+"""
+Versioned unit-price catalog.
+
+Prices are stored per version in price_catalog_items; the active (latest)
+version is held in memory as a PriceSnapshot whose NumPy array is aligned
+with the model output order, so costing a prediction is one multiply.
+Publishing a new version builds a fresh snapshot and swaps the module
+reference, so readers always see a complete catalog.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import SessionLocal
+from material_index_map import MATERIAL_INDEX_TO_NAME
+from models import PriceCatalogItem, PriceCatalogVersion
+
+GST_RATE = 0.18
+
+# how often a worker re-checks the DB for a version published elsewhere
+REFRESH_SECONDS = 30
+
+# model output order
+MATERIAL_NAMES = tuple(MATERIAL_INDEX_TO_NAME[i] for i in sorted(MATERIAL_INDEX_TO_NAME))
+
+# built-in prices, used until a catalog version is published (and as its seed)
+DEFAULT_UNIT_PRICES = {
+    # -----------------------------------------------------
+    # Core Materials & Equipment (72 unique items)
+    # -----------------------------------------------------
+    'washers_qty': 5.00,
+    'CT_units': 35000.00,
+    'PT_units': 30000.00,
+    'min_diesel_litre': 95.00,
+    'earth_wire_km': 100000.00,
+    'converter_transformer_oil_liters': 250.00,
+    'curing_compound_liters': 150.00,
+    'formwork_oil_liters': 100.00,
+    'lubrication_grease_kg': 200.00,
+    'binding_wire_kg': 65.00,
+    'arcing_horn_units': 700.00,
+    'guy_rope_m': 75.00,
+    'tower_steel_kg': 68.00,
+    'bolts_nuts_qty': 25.00,
+    'gravel_tons': 1500.00,
+    'circuit_breaker_units': 50000.00,
+    'control_cable_m': 150.00,
+    'paint_liters': 350.00,
+    'isolator_units': 25000.00,
+    'busbar_m': 800.00,
+    'harmonic_filter_units': 45000.00,
+    'vibration_dampers_units': 1200.00,
+    'backfill_soil_cum': 300.00,
+    'switchgear_units': 40000.00,
+    'cement_bags': 360.00,
+    'hardware_fittings_units': 1500.00,
+    'spacers_units': 500.00,
+    'excavated_soil_cum': 50.00,
+    'shuttering_steel_sqm': 500.00,
+    'clamps_units': 800.00,
+    'jumpers_m': 1000.00,
+    'conductor_km': 500000.00,
+    'water_liters': 5.00,
+    'extra_insulator_units': 2500.00,
+    'OPGW_km': 200000.00,
+    'galvanized_coating_kg': 30.00,
+    'concrete_mix_cum': 5000.00,
+    'spare_bolts_kg': 80.00,
+    'spare_clamps_units': 700.00,
+    'spare_conductor_m': 500.00,
+    'reinforcement_steel_kg': 60.00,
+    'packing_material_kg': 100.00,
+    'ladder_units': 4000.00,
+    'insulator_discs_units': 800.00,
+    'spare_OPGW_m': 300.00,
+    'DC_cable_km': 80000.00,
+    'earthing_rod_units': 1500.00,
+    'stay_wire_kg': 70.00,
+    'cross_arm_units': 15000.00,
+    'thyristor_valve_units': 50000000.00, # 5 Crore (HVDC Component)
+    'transformer_oil_liters': 250.00,
+    'tower_parts_units': 1000.00,
+    'safety_equipment_units': 500.00,
+    'spare_hardware_kg': 80.00,
+    'sand_tons': 1000.00,
+    'smoothing_reactor_units': 100000.00,
+    'shuttering_wood_sqm': 400.00,
+    'aggregate_tons': 1800.00,
+    'earthing_cable_m': 120.00,
+    'voltage_kv': 10000.00,        # Non-material parameter
+    'duration_months': 10000.00,     # Non-material parameter
+    'angle_steel_sections_kg': 65.00,
+    'tower_legs_kg': 65.00,
+    'tower_body_members_kg': 65.00,
+    'extension_pieces_kg': 65.00,
+    'pack_plates_kg': 65.00,
+    'environment_charges_lakhs': 100000.00, # Charge unit
+    # -----------------------------------------------------
+    # Duplicate Items (Units in parentheses) - Priced as core material
+    # -----------------------------------------------------
+    'washers_qty (qty)': 5.00,
+    'earth_wire_km (km)': 100000.00,
+    'converter_transformer_oil_liters (liters)': 250.00,
+    'curing_compound_liters (liters)': 150.00,
+    'formwork_oil_liters (liters)': 100.00,
+    'lubrication_grease_kg (kg)': 200.00,
+    'binding_wire_kg (kg)': 65.00,
+    'guy_rope_m (m)': 75.00,
+    'tower_steel_kg (kg)': 68.00,
+    'bolts_nuts_qty (qty)': 25.00,
+    'gravel_tons (tons)': 1500.00,
+    'control_cable_m (m)': 150.00,
+    'paint_liters (liters)': 350.00,
+    'busbar_m (m)': 800.00,
+    'backfill_soil_cum (m3)': 300.00,
+    'cement_bags (bags)': 360.00,
+    'excavated_soil_cum (m3)': 50.00,
+    'shuttering_steel_sqm (sqm)': 500.00,
+    'jumpers_m (m)': 1000.00,
+    'conductor_km (km)': 500000.00,
+    'water_liters (liters)': 5.00,
+    'OPGW_km (km)': 200000.00,
+    'galvanized_coating_kg (kg)': 30.00,
+    'concrete_mix_cum (m3)': 5000.00,
+    'spare_bolts_kg (kg)': 80.00,
+    'spare_conductor_m (m)': 500.00,
+    'reinforcement_steel_kg (kg)': 60.00,
+    'packing_material_kg (kg)': 100.00,
+    'spare_OPGW_m (m)': 300.00,
+    'DC_cable_km (km)': 80000.00,
+    'stay_wire_kg (kg)': 70.00,
+    'transformer_oil_liters (liters)': 250.00,
+    'spare_hardware_kg (kg)': 80.00,
+    'sand_tons (tons)': 1000.00,
+    'shuttering_wood_sqm (sqm)': 400.00,
+    'aggregate_tons (tons)': 1800.00,
+    'earthing_cable_m (m)': 120.00,
+    # -----------------------------------------------------
+    # Calculated Total Price Keys (Priced at ₹1.00 as a placeholder for a 'total unit')
+    # -----------------------------------------------------
+    'environment_charges_lakhs_price': 1.00,
+    'washers_qty (qty)_price': 1.00,
+    'CT_units_price': 1.00,
+    'PT_units_price': 1.00,
+    'min_diesel_litre_price': 1.00,
+    'earth_wire_km (km)_price': 1.00,
+    'converter_transformer_oil_liters (liters)_price': 1.00,
+    'curing_compound_liters (liters)_price': 1.00,
+    'formwork_oil_liters (liters)_price': 1.00,
+    'lubrication_grease_kg (kg)_price': 1.00,
+    'binding_wire_kg (kg)_price': 1.00,
+    'arcing_horn_units_price': 1.00,
+    'guy_rope_m (m)_price': 1.00,
+    'tower_steel_kg (kg)_price': 1.00,
+    'bolts_nuts_qty (qty)_price': 1.00,
+    'gravel_tons (tons)_price': 1.00,
+    'circuit_breaker_units_price': 1.00,
+    'control_cable_m (m)_price': 1.00,
+    'paint_liters (liters)_price': 1.00,
+    'isolator_units_price': 1.00,
+    'busbar_m (m)_price': 1.00,
+    'harmonic_filter_units_price': 1.00,
+    'vibration_dampers_units_price': 1.00,
+    'backfill_soil_cum (m3)_price': 1.00,
+    'switchgear_units_price': 1.00,
+    'cement_bags (bags)_price': 1.00,
+    'hardware_fittings_units_price': 1.00,
+    'spacers_units_price': 1.00,
+    'excavated_soil_cum (m3)_price': 1.00,
+    'shuttering_steel_sqm (sqm)_price': 1.00,
+    'clamps_units_price': 1.00,
+    'jumpers_m (m)_price': 1.00,
+    'conductor_km (km)_price': 1.00,
+    'water_liters (liters)_price': 1.00,
+    'extra_insulator_units_price': 1.00,
+    'OPGW_km (km)_price': 1.00,
+    'galvanized_coating_kg (kg)_price': 1.00,
+    'concrete_mix_cum (m3)_price': 1.00,
+    'spare_bolts_kg (kg)_price': 1.00,
+    'spare_clamps_units_price': 1.00,
+    'spare_conductor_m (m)_price': 1.00,
+    'reinforcement_steel_kg (kg)_price': 1.00,
+    'packing_material_kg (kg)_price': 1.00,
+    'ladder_units_price': 1.00,
+    'insulator_discs_units_price': 1.00,
+    'spare_OPGW_m (m)_price': 1.00,
+    'DC_cable_km (km)_price': 1.00,
+    'earthing_rod_units_price': 1.00,
+    'stay_wire_kg (kg)_price': 1.00,
+    'cross_arm_units_price': 1.00,
+    'thyristor_valve_units_price': 1.00,
+    'transformer_oil_liters (liters)_price': 1.00,
+    'tower_parts_units_price': 1.00,
+    'safety_equipment_units_price': 1.00,
+    'spare_hardware_kg (kg)_price': 1.00,
+    'sand_tons (tons)_price': 1.00,
+    'smoothing_reactor_units_price': 1.00,
+    'shuttering_wood_sqm (sqm)_price': 1.00,
+    'aggregate_tons (tons)_price': 1.00,
+    'earthing_cable_m (m)_price': 1.00,
+    'angle_steel_sections_kg_price': 1.00,
+    'tower_legs_kg_price': 1.00,
+    'tower_body_members_kg_price': 1.00,
+    'extension_pieces_kg_price': 1.00,
+    'pack_plates_kg_price': 1.00,
+}
+
+
+def default_price(name: str) -> float:
+    return DEFAULT_UNIT_PRICES.get(name, 1.0 if name.endswith("_price") else 0.0)
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    version: int                # 0 = built-in defaults, nothing published yet
+    by_name: dict
+    prices: np.ndarray          # unit price per model output, MATERIAL_NAMES order
+
+    def unit_cost(self, name: str) -> float:
+        return self.by_name.get(name, default_price(name))
+
+    def cost(self, quantities):
+        """
+        Cost one or many predictions (shape (132,) or (n, 132)).
+        Returns (line_totals, subtotal, gst, total).
+        """
+        quantities = np.asarray(quantities, dtype=np.float64)
+        line_totals = quantities * self.prices
+        subtotal = line_totals.sum(axis=-1)
+        gst = subtotal * GST_RATE
+        return line_totals, subtotal, gst, subtotal + gst
+
+    def costed_materials(self, quantities):
+        """
+        One prediction as the materials array the API returns and stores
+        (name, quantity, unit, unitCost, totalCost) + subtotal, gst, total.
+        """
+        line_totals, subtotal, gst, total = self.cost(quantities)
+        materials = [
+            {
+                "name": name,
+                "quantity": float(qty),
+                "unit": "units",
+                "unitCost": float(unit_cost),
+                "totalCost": float(line_total),
+            }
+            for name, qty, unit_cost, line_total in zip(MATERIAL_NAMES, quantities, self.prices, line_totals)
+        ]
+        return materials, float(subtotal), float(gst), float(total)
+
+
+def _build(version: int, by_name: dict) -> PriceSnapshot:
+    merged = {**DEFAULT_UNIT_PRICES, **by_name}
+    prices = np.array(
+        [merged.get(name, default_price(name)) for name in MATERIAL_NAMES],
+        dtype=np.float64,
+    )
+    prices.setflags(write=False)
+    return PriceSnapshot(version=version, by_name=merged, prices=prices)
+
+
+_snapshot = _build(0, {})
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _load_version(db, version_id: int) -> PriceSnapshot:
+    items = (
+        db.query(PriceCatalogItem.material_name, PriceCatalogItem.unit_price)
+        .filter(PriceCatalogItem.version_id == version_id)
+        .all()
+    )
+    return _build(version_id, dict(items))
+
+
+def _latest_version_id(db):
+    return db.query(func.max(PriceCatalogVersion.id)).scalar()
+
+
+def refresh(db=None) -> PriceSnapshot:
+    """Reload the snapshot if a newer version was published (by any worker)."""
+    global _snapshot, _checked_at
+
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        with _lock:
+            _checked_at = time.monotonic()
+            latest = _latest_version_id(db)
+            if latest and latest != _snapshot.version:
+                _snapshot = _load_version(db, latest)
+    except SQLAlchemyError:
+        # catalog tables not created yet -> keep serving the current snapshot
+        pass
+    finally:
+        if own_session:
+            db.close()
+    return _snapshot
+
+
+def current() -> PriceSnapshot:
+    if time.monotonic() - _checked_at > REFRESH_SECONDS:
+        return refresh()
+    return _snapshot
+
+
+def publish(db, prices: dict, note: str | None = None) -> PriceSnapshot:
+    """
+    Store a new catalog version (given prices merged over the active ones)
+    and make it the active snapshot.
+    """
+    global _snapshot, _checked_at
+
+    base = refresh(db)
+    merged = {**base.by_name, **{k: float(v) for k, v in prices.items()}}
+
+    version = PriceCatalogVersion(note=note)
+    db.add(version)
+    db.flush()
+    db.execute(
+        insert(PriceCatalogItem),
+        [
+            {"version_id": version.id, "material_name": name, "unit_price": price}
+            for name, price in merged.items()
+        ],
+    )
+    db.commit()
+
+    snapshot = _build(version.id, merged)
+    with _lock:
+        _snapshot = snapshot
+        _checked_at = time.monotonic()
+    return snapshot
+
+
+def ensure_published(db) -> PriceSnapshot:
+    """Seed version 1 from the built-in prices if nothing has been published."""
+    snapshot = refresh(db)
+    if snapshot.version == 0:
+        snapshot = publish(db, {}, note="seed: built-in default prices")
+    return snapshot
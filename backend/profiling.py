@@ -0,0 +1,196 @@
+# profiling.py
+"""
+Opt-in request profiling.
+
+Enabled with SIH_PROFILING=1 (otherwise the middleware is never installed,
+so there is no per-request cost). A request is profiled when it carries
+`X-Profile: 1` (plus `X-Admin-Token` if SIH_ADMIN_TOKEN is set) or when it
+is picked by SIH_PROFILE_SAMPLE_RATE (0..1).
+
+A profiled request runs with a sampling thread that snapshots, every
+SIH_PROFILE_INTERVAL_MS, the stacks of the threads currently working for
+that request: the event loop while it runs the request's coroutine, and
+threadpool workers running sync code under the request's context (sync
+endpoints run in the threadpool, so per-thread profilers would miss them).
+Other requests, the save-queue writer and shadow workers are left out.
+Stacks are rooted at the thread name. Samples are written in
+"folded" flame-graph format (open with speedscope.app or flamegraph.pl) to
+SIH_PROFILE_DIR, keeping the newest SIH_PROFILE_KEEP profiles.
+"""
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+ENABLED = os.getenv("SIH_PROFILING") == "1"
+SAMPLE_RATE = float(os.getenv("SIH_PROFILE_SAMPLE_RATE", "0"))
+INTERVAL = float(os.getenv("SIH_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("SIH_PROFILE_DIR", "profiles")
+KEEP = int(os.getenv("SIH_PROFILE_KEEP", "50"))
+ADMIN_TOKEN = os.getenv("SIH_ADMIN_TOKEN")
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# stacks whose innermost frame is one of these are parked threads, not work
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "_worker", "accept", "sleep"}
+
+# the sampler of the request being handled; threadpool calls run in a copy
+# of the request's context, so their worker frames carry it too
+_active_sampler = contextvars.ContextVar("profile_sampler", default=None)
+
+
+def is_admin(headers) -> bool:
+    return ADMIN_TOKEN is None or headers.get("x-admin-token") == ADMIN_TOKEN
+
+
+class StackSampler:
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _owns(self, frame) -> bool:
+        """Is this stack working for our request?"""
+        while frame is not None:
+            code = frame.f_code
+            if code is _MIDDLEWARE_CODE:
+                # event loop thread, currently inside this request's coroutine
+                if frame.f_locals.get("sampler") is self:
+                    return True
+            elif "context" in code.co_varnames:
+                # threadpool worker running `context.run(func)`
+                context = frame.f_locals.get("context")
+                if isinstance(context, contextvars.Context) and context.get(_active_sampler) is self:
+                    return True
+            frame = frame.f_back
+        return False
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                if not self._owns(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                    stack.append(f"{module}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def _write(profile_id: str, sampler: StackSampler, meta: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w") as fh:
+        for stack, count in sampler.samples.most_common():
+            fh.write(f"{stack} {count}\n")
+    meta["samples"] = sum(sampler.samples.values())
+    meta["intervalMs"] = sampler.interval * 1000
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as fh:
+        json.dump(meta, fh)
+    _enforce_retention()
+
+
+def _enforce_retention():
+    # ids start with a UTC timestamp, so file names sort oldest -> newest
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for profile_id in ids[:-KEEP] if KEEP > 0 else ids:
+        for ext in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda m: m["id"], reverse=True)
+
+
+def profile_path(profile_id: str) -> str | None:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware; only installed when SIH_PROFILING=1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, headers) -> bool:
+        if headers.get("x-profile") == "1" and is_admin(headers):
+            return True
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        if not self._wanted(headers):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", []).append((b"x-profile-id", profile_id.encode()))
+            await send(message)
+
+        sampler = StackSampler()
+        started = time.perf_counter()
+        token = _active_sampler.set(sampler)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_sampler.reset(token)
+            # thread joins and file I/O stay off the event loop
+            await run_in_threadpool(sampler.stop)
+            await run_in_threadpool(_write, profile_id, sampler, {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status.get("code"),
+                "durationMs": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+
+_MIDDLEWARE_CODE = ProfilingMiddleware.__call__.__code__
@@ -0,0 +1,202 @@
+# rate_limit.py
+"""
+Token-bucket admission control for the inference endpoints.
+
+Each (scope, client) pair has a bucket of `capacity` tokens refilled at a
+steady rate; a request spends `cost` tokens (1 for single forecasts, the
+row count for batch endpoints). Rejected requests get 429 + Retry-After.
+
+Clients are keyed by client IP. A client-supplied user id (X-User-Id) is
+not a credential here, so it must not pick the bucket: rotating it would
+reset the budget on every request. Buckets live in process memory; set
+SIH_RATE_LIMIT_STORE=/path/to/file.db to share them between the workers of
+one host through a small SQLite file.
+
+Budgets are "<capacity>/<seconds>" and can be overridden per scope, e.g.
+SIH_RATE_LIMIT_FORECAST_SAVE=20/60.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, Response
+
+DEFAULT_LIMITS = {
+    "forecast_predict": "60/60",
+    "forecast_save": "20/60",
+    "forecast_batch": "20000/60",   # weighted by row count
+}
+
+
+def _parse(spec: str) -> tuple[float, float]:
+    capacity, seconds = spec.split("/")
+    return float(capacity), float(capacity) / float(seconds)
+
+
+def load_limits() -> dict:
+    return {
+        scope: _parse(os.getenv(f"SIH_RATE_LIMIT_{scope.upper()}", spec))
+        for scope, spec in DEFAULT_LIMITS.items()
+    }
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    remaining: float
+    retry_after: float
+    capacity: float
+
+
+class MemoryStore:
+    MAX_KEYS = 50_000
+    SWEEP_INTERVAL = 10.0   # seconds between idle sweeps once MAX_KEYS is exceeded
+
+    def __init__(self):
+        self._buckets = {}   # bucket -> (tokens, last update, time it is full again)
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def take(self, bucket: str, cost: float, capacity: float, rate: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _ = self._buckets.get(bucket, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            full_at = now + (capacity - tokens) / rate if rate else math.inf
+            self._buckets[bucket] = (tokens, now, full_at)
+            if len(self._buckets) > self.MAX_KEYS and now >= self._next_sweep:
+                self._evict_idle(now)
+                self._next_sweep = now + self.SWEEP_INTERVAL
+            return allowed, tokens
+
+    def _evict_idle(self, now):
+        # a bucket that has refilled to capacity (by its own scope's rate) carries no state
+        for key in [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteStore:
+    """Buckets shared by all workers on one host (wall-clock based)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (bucket TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.close()
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def _conn(self):
+        if not hasattr(self._local, "conn"):
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def take(self, bucket: str, cost: float, capacity: float, rate: float) -> tuple[bool, float]:
+        conn, now = self._conn(), time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE bucket = ?", (bucket,)).fetchone()
+            tokens, last = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (bucket, tokens, updated) VALUES (?, ?, ?)",
+                (bucket, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, limits: dict, store):
+        self.limits = limits
+        self.store = store
+        self._stats = defaultdict(lambda: {"allowed": 0, "rejected": 0, "tokensSpent": 0.0})
+        self._stats_lock = threading.Lock()
+
+    def acquire(self, scope: str, client: str, cost: float = 1) -> Decision:
+        capacity, rate = self.limits[scope]
+        allowed, tokens = self.store.take(f"{scope}:{client}", cost, capacity, rate)
+        with self._stats_lock:
+            stats = self._stats[scope]
+            stats["allowed" if allowed else "rejected"] += 1
+            if allowed:
+                stats["tokensSpent"] += cost
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return Decision(allowed, tokens, retry_after, capacity)
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            stats = {scope: dict(values) for scope, values in self._stats.items()}
+        return {
+            "store": type(self.store).__name__,
+            "trackedBuckets": self.store.size(),
+            "limits": {
+                scope: {"capacity": capacity, "refillPerSecond": rate}
+                for scope, (capacity, rate) in self.limits.items()
+            },
+            "scopes": stats,
+        }
+
+
+def _make_store():
+    path = os.getenv("SIH_RATE_LIMIT_STORE")
+    return SQLiteStore(path) if path else MemoryStore()
+
+
+limiter = RateLimiter(load_limits(), _make_store())
+
+
+def client_key(request: Request) -> str:
+    # key on a verified user id instead once requests carry a real credential
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def check(request: Request, scope: str, cost: float = 1, response: Response | None = None):
+    """Spend `cost` tokens for the caller or raise 429 (413 if it can never fit)."""
+    capacity, _ = limiter.limits[scope]
+    if cost > capacity:
+        raise HTTPException(413, f"Request needs {cost:g} tokens; the {scope} budget is {capacity:g}")
+
+    decision = limiter.acquire(scope, client_key(request), cost)
+    headers = {
+        "X-RateLimit-Limit": f"{decision.capacity:g}",
+        "X-RateLimit-Remaining": str(int(decision.remaining)),
+    }
+    if not decision.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+        raise HTTPException(429, "Rate limit exceeded", headers=headers)
+    if response is not None:
+        response.headers.update(headers)
+
+
+def rate_limited(scope: str):
+    """Route dependency: one token per request."""
+    def dependency(request: Request, response: Response):
+        check(request, scope, 1, response)
+    return Depends(dependency)
@@ -0,0 +1,204 @@
+# response_cache.py
+"""
+Serialized-response cache for hot read endpoints.
+
+Entries are JSON bytes stored under "<namespace>:<generation>:<key>".
+Writers call invalidate(namespace), which bumps the namespace generation so
+every older entry becomes unreachable at once (and ages out via LRU / TTL).
+Generation counters live in the backend, so with a shared backend one
+worker's write invalidates the cache for all workers.
+
+Backends (SIH_CACHE_URL):
+    unset / "memory"        in-process LRU (default; per worker)
+    sqlite:///path/file.db  shared across the workers of one host
+    redis://host:6379/0     shared across hosts (needs the `redis` package)
+    "off"                   caching disabled
+
+SIH_CACHE_TTL (seconds, default 300) bounds how long an entry can live, which
+is also the staleness limit for writes made outside the API process when the
+default per-worker backend is used.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_URL = os.getenv("SIH_CACHE_URL", "memory")
+TTL = float(os.getenv("SIH_CACHE_TTL", "300"))
+MAX_ENTRIES = int(os.getenv("SIH_CACHE_MAX_ENTRIES", "1024"))
+
+# namespaces used by the routes
+PROJECTS = "projects"
+FORECASTS = "forecasts"
+
+
+def materials(project_id) -> str:
+    return f"materials:{project_id}"
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def counter(self, name) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+
+class SQLiteBackend:
+    """Shared by every worker on the host; the local stand-in for a KV server."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_expires ON entries (expires)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value: bytes, ttl: float):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, now + ttl),
+        )
+        # keep the file bounded: drop expired rows, then the soonest-expiring overflow
+        conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+        conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def counter(self, name) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name) -> int:
+        return self._conn().execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value",
+            (name,),
+        ).fetchone()[0]
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for redis:// URLs
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(f"sih:cache:{key}")
+
+    def set(self, key, value: bytes, ttl: float):
+        self._client.set(f"sih:cache:{key}", value, ex=max(1, int(ttl)))
+
+    def counter(self, name) -> int:
+        return int(self._client.get(f"sih:gen:{name}") or 0)
+
+    def incr(self, name) -> int:
+        return self._client.incr(f"sih:gen:{name}")
+
+
+def make_backend(url: str = CACHE_URL):
+    if url in ("", "off"):
+        return None
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SIH_CACHE_URL: {url}")
+
+
+backend = make_backend()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+
+def stats() -> dict:
+    return {"backend": type(backend).__name__ if backend else None, "ttl": TTL, **_stats}
+
+
+def get_or_build(namespace: str, key: str, build, ttl: float = TTL) -> bytes:
+    """
+    Cached JSON bytes for (namespace, key); `build()` produces them on a miss.
+    Backend errors fall through to build() so the cache can never fail a read.
+    """
+    if backend is None:
+        return build()
+    try:
+        full_key = f"{namespace}:{backend.counter(namespace)}:{key}"
+        value = backend.get(full_key)
+    except Exception:
+        _stats["errors"] += 1
+        return build()
+    if value is not None:
+        _stats["hits"] += 1
+        return value
+
+    _stats["misses"] += 1
+    value = build()
+    try:
+        backend.set(full_key, value, ttl)
+    except Exception:
+        _stats["errors"] += 1
+    return value
+
+
+def invalidate(*namespaces):
+    """Called after a write commits; readers of these namespaces rebuild."""
+    if backend is None:
+        return
+    for namespace in namespaces:
+        try:
+            backend.incr(namespace)
+            _stats["invalidations"] += 1
+        except Exception:
+            _stats["errors"] += 1
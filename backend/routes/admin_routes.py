@@ -0,0 +1,53 @@
+# routes/admin_routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+import profiling
+import response_cache
+import shadow
+from database import get_db
+from rate_limit import limiter
+
+
+def require_admin(request: Request):
+    # open when SIH_ADMIN_TOKEN is unset (local dev), like the rest of the API
+    if not profiling.is_admin(request.headers):
+        raise HTTPException(403, "Admin token required")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/ratelimit")
+def rate_limit_metrics():
+    return limiter.metrics()
+
+
+@router.get("/cache")
+def cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/profiles")
+def list_profiles():
+    return {"enabled": profiling.ENABLED, "profiles": profiling.list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
+
+@router.get("/shadow")
+def shadow_summary(
+    version: str | None = None,
+    limit: int = Query(1000, ge=1, le=50000),
+    top: int = Query(10, ge=1, le=132),
+    db: Session = Depends(get_db),
+):
+    """Candidate-vs-primary deltas over the most recent shadow evaluations."""
+    return shadow.summary(db, shadow_version=version, limit=limit, top=top)
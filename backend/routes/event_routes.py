@@ -0,0 +1,44 @@
+# routes/event_routes.py
+import asyncio
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+import events
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    types: list[str] = Query(default=[]),
+    last_event_id: int | None = Header(None),
+):
+    """
+    Server-sent events: forecast.saved, project.created, material.created,
+    forecasts.recosted and resync (client should refetch). Filter with
+    ?types=...; reconnects send Last-Event-ID and get only missed events.
+    """
+    sub = events.subscribe(types or None, last_event_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # keeps proxies from closing an idle stream
+                    continue
+                yield events.format_sse(message)
+        finally:
+            events.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,341 +1,192 @@
 # routes/forecast.py
-from fastapi import APIRouter, Depends, HTTPException
+import io
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Forecast, ForecastMaterial
+from database import get_db, engine
+from models import (
+    Forecast,
+    ForecastMaterial,
+    ForecastResult,
+    ForecastResultMaterial,
+    PriceCatalogItem,
+)
 from schemas import (
+    PricePublish,
     ForecastInput,
     ForecastResponse,
     MaterialPrediction,
     ForecastWithPredictions,
 )
-import joblib
-import pandas as pd
-
+import accuracy_backfill
+import archive
+import events
+import forecast_store
+import inference
+import price_catalog
+import response_cache
+import save_queue
+import shadow
+from forecast_store import persist_forecast
 from material_index_map import MATERIAL_INDEX_TO_NAME
+from rate_limit import check, rate_limited
+from routes.admin_routes import require_admin
 
 router = APIRouter(prefix="/forecast", tags=["Forecast API"])
 
-materials_unit_prices_estimated = {
-    # -----------------------------------------------------
-    # Core Materials & Equipment (72 unique items)
-    # -----------------------------------------------------
-    'washers_qty': 5.00,
-    'CT_units': 35000.00,
-    'PT_units': 30000.00,
-    'min_diesel_litre': 95.00,
-    'earth_wire_km': 100000.00,
-    'converter_transformer_oil_liters': 250.00,
-    'curing_compound_liters': 150.00,
-    'formwork_oil_liters': 100.00,
-    'lubrication_grease_kg': 200.00,
-    'binding_wire_kg': 65.00,
-    'arcing_horn_units': 700.00,
-    'guy_rope_m': 75.00,
-    'tower_steel_kg': 68.00,
-    'bolts_nuts_qty': 25.00,
-    'gravel_tons': 1500.00,
-    'circuit_breaker_units': 50000.00,
-    'control_cable_m': 150.00,
-    'paint_liters': 350.00,
-    'isolator_units': 25000.00,
-    'busbar_m': 800.00,
-    'harmonic_filter_units': 45000.00,
-    'vibration_dampers_units': 1200.00,
-    'backfill_soil_cum': 300.00,
-    'switchgear_units': 40000.00,
-    'cement_bags': 360.00,
-    'hardware_fittings_units': 1500.00,
-    'spacers_units': 500.00,
-    'excavated_soil_cum': 50.00,
-    'shuttering_steel_sqm': 500.00,
-    'clamps_units': 800.00,
-    'jumpers_m': 1000.00,
-    'conductor_km': 500000.00,
-    'water_liters': 5.00,
-    'extra_insulator_units': 2500.00,
-    'OPGW_km': 200000.00,
-    'galvanized_coating_kg': 30.00,
-    'concrete_mix_cum': 5000.00,
-    'spare_bolts_kg': 80.00,
-    'spare_clamps_units': 700.00,
-    'spare_conductor_m': 500.00,
-    'reinforcement_steel_kg': 60.00,
-    'packing_material_kg': 100.00,
-    'ladder_units': 4000.00,
-    'insulator_discs_units': 800.00,
-    'spare_OPGW_m': 300.00,
-    'DC_cable_km': 80000.00,
-    'earthing_rod_units': 1500.00,
-    'stay_wire_kg': 70.00,
-    'cross_arm_units': 15000.00,
-    'thyristor_valve_units': 50000000.00, # 5 Crore (HVDC Component)
-    'transformer_oil_liters': 250.00,
-    'tower_parts_units': 1000.00,
-    'safety_equipment_units': 500.00,
-    'spare_hardware_kg': 80.00,
-    'sand_tons': 1000.00,
-    'smoothing_reactor_units': 100000.00,
-    'shuttering_wood_sqm': 400.00,
-    'aggregate_tons': 1800.00,
-    'earthing_cable_m': 120.00,
-    'voltage_kv': 10000.00,        # Non-material parameter
-    'duration_months': 10000.00,     # Non-material parameter
-    'angle_steel_sections_kg': 65.00,
-    'tower_legs_kg': 65.00,
-    'tower_body_members_kg': 65.00,
-    'extension_pieces_kg': 65.00,
-    'pack_plates_kg': 65.00,
-    'environment_charges_lakhs': 100000.00, # Charge unit
-    # -----------------------------------------------------
-    # Duplicate Items (Units in parentheses) - Priced as core material
-    # -----------------------------------------------------
-    'washers_qty (qty)': 5.00,
-    'earth_wire_km (km)': 100000.00,
-    'converter_transformer_oil_liters (liters)': 250.00,
-    'curing_compound_liters (liters)': 150.00,
-    'formwork_oil_liters (liters)': 100.00,
-    'lubrication_grease_kg (kg)': 200.00,
-    'binding_wire_kg (kg)': 65.00,
-    'guy_rope_m (m)': 75.00,
-    'tower_steel_kg (kg)': 68.00,
-    'bolts_nuts_qty (qty)': 25.00,
-    'gravel_tons (tons)': 1500.00,
-    'control_cable_m (m)': 150.00,
-    'paint_liters (liters)': 350.00,
-    'busbar_m (m)': 800.00,
-    'backfill_soil_cum (m3)': 300.00,
-    'cement_bags (bags)': 360.00,
-    'excavated_soil_cum (m3)': 50.00,
-    'shuttering_steel_sqm (sqm)': 500.00,
-    'jumpers_m (m)': 1000.00,
-    'conductor_km (km)': 500000.00,
-    'water_liters (liters)': 5.00,
-    'OPGW_km (km)': 200000.00,
-    'galvanized_coating_kg (kg)': 30.00,
-    'concrete_mix_cum (m3)': 5000.00,
-    'spare_bolts_kg (kg)': 80.00,
-    'spare_conductor_m (m)': 500.00,
-    'reinforcement_steel_kg (kg)': 60.00,
-    'packing_material_kg (kg)': 100.00,
-    'spare_OPGW_m (m)': 300.00,
-    'DC_cable_km (km)': 80000.00,
-    'stay_wire_kg (kg)': 70.00,
-    'transformer_oil_liters (liters)': 250.00,
-    'spare_hardware_kg (kg)': 80.00,
-    'sand_tons (tons)': 1000.00,
-    'shuttering_wood_sqm (sqm)': 400.00,
-    'aggregate_tons (tons)': 1800.00,
-    'earthing_cable_m (m)': 120.00,
-    # -----------------------------------------------------
-    # Calculated Total Price Keys (Priced at ₹1.00 as a placeholder for a 'total unit')
-    # -----------------------------------------------------
-    'environment_charges_lakhs_price': 1.00,
-    'washers_qty (qty)_price': 1.00,
-    'CT_units_price': 1.00,
-    'PT_units_price': 1.00,
-    'min_diesel_litre_price': 1.00,
-    'earth_wire_km (km)_price': 1.00,
-    'converter_transformer_oil_liters (liters)_price': 1.00,
-    'curing_compound_liters (liters)_price': 1.00,
-    'formwork_oil_liters (liters)_price': 1.00,
-    'lubrication_grease_kg (kg)_price': 1.00,
-    'binding_wire_kg (kg)_price': 1.00,
-    'arcing_horn_units_price': 1.00,
-    'guy_rope_m (m)_price': 1.00,
-    'tower_steel_kg (kg)_price': 1.00,
-    'bolts_nuts_qty (qty)_price': 1.00,
-    'gravel_tons (tons)_price': 1.00,
-    'circuit_breaker_units_price': 1.00,
-    'control_cable_m (m)_price': 1.00,
-    'paint_liters (liters)_price': 1.00,
-    'isolator_units_price': 1.00,
-    'busbar_m (m)_price': 1.00,
-    'harmonic_filter_units_price': 1.00,
-    'vibration_dampers_units_price': 1.00,
-    'backfill_soil_cum (m3)_price': 1.00,
-    'switchgear_units_price': 1.00,
-    'cement_bags (bags)_price': 1.00,
-    'hardware_fittings_units_price': 1.00,
-    'spacers_units_price': 1.00,
-    'excavated_soil_cum (m3)_price': 1.00,
-    'shuttering_steel_sqm (sqm)_price': 1.00,
-    'clamps_units_price': 1.00,
-    'jumpers_m (m)_price': 1.00,
-    'conductor_km (km)_price': 1.00,
-    'water_liters (liters)_price': 1.00,
-    'extra_insulator_units_price': 1.00,
-    'OPGW_km (km)_price': 1.00,
-    'galvanized_coating_kg (kg)_price': 1.00,
-    'concrete_mix_cum (m3)_price': 1.00,
-    'spare_bolts_kg (kg)_price': 1.00,
-    'spare_clamps_units_price': 1.00,
-    'spare_conductor_m (m)_price': 1.00,
-    'reinforcement_steel_kg (kg)_price': 1.00,
-    'packing_material_kg (kg)_price': 1.00,
-    'ladder_units_price': 1.00,
-    'insulator_discs_units_price': 1.00,
-    'spare_OPGW_m (m)_price': 1.00,
-    'DC_cable_km (km)_price': 1.00,
-    'earthing_rod_units_price': 1.00,
-    'stay_wire_kg (kg)_price': 1.00,
-    'cross_arm_units_price': 1.00,
-    'thyristor_valve_units_price': 1.00,
-    'transformer_oil_liters (liters)_price': 1.00,
-    'tower_parts_units_price': 1.00,
-    'safety_equipment_units_price': 1.00,
-    'spare_hardware_kg (kg)_price': 1.00,
-    'sand_tons (tons)_price': 1.00,
-    'smoothing_reactor_units_price': 1.00,
-    'shuttering_wood_sqm (sqm)_price': 1.00,
-    'aggregate_tons (tons)_price': 1.00,
-    'earthing_cable_m (m)_price': 1.00,
-    'angle_steel_sections_kg_price': 1.00,
-    'tower_legs_kg_price': 1.00,
-    'tower_body_members_kg_price': 1.00,
-    'extension_pieces_kg_price': 1.00,
-    'pack_plates_kg_price': 1.00,
-}
-
 # -----------------------------------
-# 🔥 Load Model + Scaler Once
+# 🔥 Model + Scaler load lazily on the first prediction (inference.py)
 # -----------------------------------
-try:
-    model = joblib.load("Balanced_Material_Model.pkl")
-    y_scaler = joblib.load("Balanced_YScaler.pkl")
-    print("✅ ML Model + Scaler Loaded")
-except:
-    model, y_scaler = None, None
-    print("⚠️ MODEL LOAD FAILED — Check file paths")
-
-
-INPUT_FEATURES = [
-    "project_category_main",
-    "project_type",
-    "project_budget_price_in_lake",
-    "state",
-    "terrain",
-    "distance_from_storage_unit",
-    "transmission_line_length_km",
-]
+def _predict_one(body: ForecastInput):
+    model, _ = inference.load()
+    if model is None:
+        raise HTTPException(500, "ML model not loaded")
+    return inference.predict([body.model_dump(include=set(inference.INPUT_FEATURES))])[0]
+
+
+def _shadow(source: str, body: ForecastInput, primary):
+    # fire-and-forget copy to the candidate model (no-op unless configured)
+    shadow.submit(source, body.model_dump(include=set(inference.INPUT_FEATURES)), primary)
 
 
 # ======================================================================================
 # 1️⃣ PREDICT + SAVE to DATABASE (Your Existing Feature Improved)
 # ======================================================================================
 # change-1(4-12-2025)
-@router.post("/save")
-def save_forecast(body: ForecastInput, db: Session = Depends(get_db)):
-
-    if model is None:
-        raise HTTPException(500, "ML model not loaded")
-
-    # -------------- SAVE INPUT TO DB --------------
-    entry = Forecast(
-        project_category_main=body.project_category_main,
-        project_type=body.project_type,
-        project_budget_price_in_lake=body.project_budget_price_in_lake,
-        state=body.state,
-        terrain=body.terrain,
-        distance_from_storage_unit=body.distance_from_storage_unit,
-        transmission_line_length_km=body.transmission_line_length_km,
-        location=body.location,
-        project_name=body.project_name,
+@router.post("/save", dependencies=[rate_limited("forecast_save")])
+def save_forecast(
+    body: ForecastInput,
+    mode: Literal["sync", "async"] = "sync",
+    idempotency_key: str | None = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    mode=sync  -> respond after the forecast is committed (default).
+    mode=async -> respond as soon as inference is done; the write is queued
+                  (durably) and its progress is at /forecast/jobs/{jobId}.
+
+    Identical model inputs (same model + price version) reuse one stored
+    result, skipping inference. A repeated Idempotency-Key returns the
+    forecast saved the first time (or its still-queued job); reusing it with
+    a different payload is 409.
+    """
+    if idempotency_key:
+        existing = forecast_store.find_by_idempotency_key(db, idempotency_key)
+        if existing is not None:
+            if not _same_request(existing, body):
+                raise HTTPException(409, "Idempotency-Key was already used with a different payload")
+            # ForecastInput and Forecast share the field names _saved_response reads
+            return _saved_response(
+                existing, existing.id, forecast_store.forecast_materials(db, existing),
+                existing.subtotal, existing.gst, existing.total,
+            )
+        job = save_queue.find_by_idempotency_key(idempotency_key)
+        if job is not None:
+            return _queued_response(job, body)
+
+    prices = price_catalog.current()
+    model_version = inference.model_version()
+    content_hash = forecast_store.content_hash(
+        body.model_dump(include=set(inference.INPUT_FEATURES)), model_version, prices.version
     )
 
-    db.add(entry)
-    db.commit()
-    db.refresh(entry)
-
-    # -------------- PREPARE DATAFRAME FOR MODEL --------------
-    X_df = pd.DataFrame([{
-        "project_category_main": body.project_category_main,
-        "project_type": body.project_type,
-        "project_budget_price_in_lake": body.project_budget_price_in_lake,
-        "state": body.state,
-        "terrain": body.terrain,
-
-        # canonical API / DB field (keep this)
-        "distance_from_storage_unit": body.distance_from_storage_unit,
-
-        # legacy/model compatibility column (exact name expected by saved pipeline)
-        "Distance_from_Storage_unit": body.distance_from_storage_unit,
-
-        "transmission_line_length_km": body.transmission_line_length_km,
-    }])
-
-    scaled_output = model.predict(X_df)
-    final_pred = y_scaler.inverse_transform(scaled_output)[0]
+    cached = forecast_store.find_result(db, content_hash)
+    if cached is not None:
+        materials = forecast_store.result_materials(db, cached.id)
+        subtotal, gst, total = cached.subtotal, cached.gst, cached.total
+        _shadow("save", body, [m["quantity"] for m in materials])
+    else:
+        final_pred = _predict_one(body)
+        _shadow("save", body, final_pred)
+        # provide materials array expected by frontend
+        materials, subtotal, gst, total = prices.costed_materials(final_pred)
+
+    record = {
+        "fields": {
+            "project_category_main": body.project_category_main,
+            "project_type": body.project_type,
+            "project_budget_price_in_lake": body.project_budget_price_in_lake,
+            "state": body.state,
+            "terrain": body.terrain,
+            "distance_from_storage_unit": body.distance_from_storage_unit,
+            "transmission_line_length_km": body.transmission_line_length_km,
+            "location": body.location,
+            "project_name": body.project_name or "Unknown",
+        },
+        "materials": materials,
+        "subtotal": subtotal,
+        "gst": gst,
+        "total": total,
+        "price_version": prices.version,
+        "content_hash": content_hash,
+        "model_version": model_version,
+        "idempotency_key": idempotency_key,
+    }
 
-    # -------------- MAP PREDICTIONS TO MATERIAL NAMES --------------
-    predictions = [
-        MaterialPrediction(
-            material_name=MATERIAL_INDEX_TO_NAME.get(i, f"material_{i}"),
-            predicted_value=float(v)
-        )
-        for i, v in enumerate(final_pred)
-    ]
+    # -------------- SAVE (one transaction, or queued) --------------
+    if mode == "async":
+        try:
+            job_id = save_queue.enqueue(record)
+        except save_queue.DuplicateKey as dup:
+            # the same key was queued concurrently
+            return _queued_response(dup.job, body)
+        response = _saved_response(body, None, materials, subtotal, gst, total)
+        response["jobId"] = job_id
+        response["status"] = "queued"
+        return response
+
+    try:
+        entry = persist_forecast(db, record)
+        db.commit()
+    except IntegrityError:
+        # another worker stored the same result / key first; reuse theirs
+        db.rollback()
+        entry = persist_forecast(db, record)
+        db.commit()
+    response_cache.invalidate(response_cache.FORECASTS)
+    events.publish("forecast.saved", forecast_store.forecast_event(entry))
 
     print("\n📌 Forecast Saved → ID:", entry.id)
-    print("██████ MODEL OUTPUT ██████")
-    print(final_pred)
-
-    # provide materials array expected by frontend
-    materials = [
-        {
-            "name": p.material_name,
-            "quantity": p.predicted_value,
-            "unit": "units",
-
-            # unit cost logic
-            "unitCost": materials_unit_prices_estimated.get(
-                p.material_name,
-                1.0 if p.material_name.endswith("_price") else 0
-            ),
-
-            # total cost = quantity × unit cost
-            "totalCost": float(p.predicted_value) * float(
-                materials_unit_prices_estimated.get(
-                    p.material_name,
-                    1.0 if p.material_name.endswith("_price") else 0
-                )
-            )
-        }
-        for p in predictions
-    ]
+    return _saved_response(body, entry.id, materials, subtotal, gst, total)
+
+
+def _same_request(saved: Forecast, body: ForecastInput) -> bool:
+    for name in inference.INPUT_FEATURES:
+        stored, sent = getattr(saved, name), getattr(body, name)
+        if isinstance(sent, (int, float)) and not isinstance(sent, bool):
+            if stored is None or float(stored) != float(sent):
+                return False
+        elif stored != sent:
+            return False
+    return saved.location == body.location and saved.project_name == (body.project_name or "Unknown")
+
+
+def _queued_response(job: dict, body: ForecastInput):
+    """Replay of an async save whose job still holds the Idempotency-Key."""
+    record = job["record"]
+    # the queued fields use the Forecast column names _same_request/_saved_response read
+    saved = SimpleNamespace(**record["fields"])
+    if not _same_request(saved, body):
+        raise HTTPException(409, "Idempotency-Key was already used with a different payload")
+    response = _saved_response(
+        saved, job["forecastId"], record["materials"], record["subtotal"], record["gst"], record["total"]
+    )
+    response["jobId"] = job["jobId"]
+    response["status"] = job["status"]
+    return response
 
-    # -------------- SAVE FORECAST MATERIALS TO DB --------------
-    for p in predictions:
-        unit_cost = materials_unit_prices_estimated.get(
-            p.material_name,
-            1.0 if p.material_name.endswith("_price") else 0
-        )
-        total_cost = float(p.predicted_value) * float(unit_cost)
-        
-        forecast_material = ForecastMaterial(
-            forecast_id=entry.id,
-            material_name=p.material_name,
-            predicted_qty=p.predicted_value,
-            unit="units",
-            unit_cost=unit_cost,
-            total_cost=total_cost
-        )
-        db.add(forecast_material)
-    
-    # compute subtotal, gst, total for save response
-    subtotal = float(sum(item.get("totalCost", 0.0) for item in materials))
-    gst = float(subtotal * 0.18)
-    total = float(subtotal + gst)
-    
-    # Update forecast with cost and budget info before commit
-    entry.total = total
-    entry.budget = body.project_budget_price_in_lake
-    entry.project_name = body.project_name or "Unknown"
-    
-    db.commit()
 
+def _saved_response(body: ForecastInput, forecast_id, materials, subtotal, gst, total):
     return {
-        "forecastId": entry.id,
+        "forecastId": forecast_id,
         "projectName": body.project_name,
         "projectType": body.project_type,
         "location": body.location,
@@ -345,42 +196,33 @@ def save_forecast(body: ForecastInput, db: Session = Depends(get_db)):
         "lineLength": body.transmission_line_length_km,
         "confidence": 90,
         "materials": materials,
-        "predictions": predictions,
+        "predictions": [
+            MaterialPrediction(material_name=m["name"], predicted_value=float(m["quantity"]))
+            for m in materials
+        ],
         "subtotal": subtotal,
         "gst": gst,
         "total": total
     }
 
 
+@router.get("/jobs/{job_id}")
+def get_save_job(job_id: str):
+    job = save_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
 
 # ======================================================================================
 # 2️⃣ ONLY PREDICT (NO DATABASE SAVE) — For UI Instant Forecast ⚡
 # ======================================================================================
 # change-2(4-12-2025)
-@router.post("/predict")
+@router.post("/predict", dependencies=[rate_limited("forecast_predict")])
 def predict_only(body: ForecastInput):
 
-    if model is None:
-        raise HTTPException(500, "ML model not loaded")
-
-    X_df = pd.DataFrame([{
-        "project_category_main": body.project_category_main,
-        "project_type": body.project_type,
-        "project_budget_price_in_lake": body.project_budget_price_in_lake,
-        "state": body.state,
-        "terrain": body.terrain,
-
-        # canonical API / DB field (keep this)
-        "distance_from_storage_unit": body.distance_from_storage_unit,
-
-        # legacy/model compatibility column (exact name expected by saved pipeline)
-        "Distance_from_Storage_unit": body.distance_from_storage_unit,
-
-        "transmission_line_length_km": body.transmission_line_length_km,
-    }])
-
-    scaled_output = model.predict(X_df)
-    final_pred = y_scaler.inverse_transform(scaled_output)[0]
+    final_pred = _predict_one(body)
+    _shadow("predict", body, final_pred)
 
     results = [
         MaterialPrediction(
@@ -390,38 +232,7 @@ def predict_only(body: ForecastInput):
         for i, v in enumerate(final_pred)
     ]
 
-    # provide materials array expected by frontend
-    materials = [
-        {
-            "name": r.material_name,
-            "quantity": float(r.predicted_value),
-            "unit": "units",
-
-            # unitCost: use dict fallback, or 1.0 for *_price keys, else 0.0
-            "unitCost": materials_unit_prices_estimated.get(
-                r.material_name,
-                1.0 if r.material_name.endswith("_price") else 0.0
-            ),
-
-            # totalCost = quantity * unitCost
-            "totalCost": float(r.predicted_value) * float(
-                materials_unit_prices_estimated.get(
-                    r.material_name,
-                    1.0 if r.material_name.endswith("_price") else 0.0
-                )
-            )
-        }
-        for r in results
-    ]
-
-    # Calculate subtotal = sum of all totalCost values
-    subtotal = sum(item["totalCost"] for item in materials)
-
-    # GST = 18% of subtotal
-    gst = subtotal * 0.18
-
-    # Final total
-    total = subtotal + gst
+    materials, subtotal, gst, total = price_catalog.current().costed_materials(final_pred)
 
     return {
         "materials": materials,
@@ -438,10 +249,20 @@ def forecast_root():
 
 
 @router.get("/history")
-def get_forecast_history(db: Session = Depends(get_db)):
+def get_forecast_history(include_archived: bool = False, db: Session = Depends(get_db)):
     """
     Returns real saved forecast data from database for Forecast History page.
+    include_archived=true appends forecasts moved to the cold archive.
     """
+    body = response_cache.get_or_build(
+        response_cache.FORECASTS,
+        f"history:{int(include_archived)}",
+        lambda: json.dumps(_forecast_history(db, include_archived)).encode(),
+    )
+    return Response(content=body, media_type="application/json")
+
+
+def _forecast_history(db: Session, include_archived: bool) -> list[dict]:
     forecasts = (
         db.query(Forecast)
         .order_by(Forecast.id.desc())
@@ -457,10 +278,317 @@ def get_forecast_history(db: Session = Depends(get_db)):
             "accuracy": float(f.accuracy) if f.accuracy is not None else None,
             "status": f.status
         })
+
+    if include_archived:
+        for f in archive.read_archived(exclude_ids={f.id for f in forecasts}):
+            result.append({
+                "projectName": f["project_name"],
+                "estimatedCost": f["total"],
+                "actualCost": f["budget"],
+                "accuracy": float(f["accuracy"]) if f["accuracy"] is not None else None,
+                "status": "Archived"
+            })
     
     return result
 
 
+# ======================================================================================
+# 3️⃣ PORTFOLIO AGGREGATE — material demand grouped in SQL (single GROUP BY)
+# ======================================================================================
+def _month_expr(column):
+    if engine.dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+@router.get("/aggregate")
+def aggregate_forecast_materials(
+    group_by: list[Literal["state", "category", "month"]] = Query(default=[]),
+    state: str | None = None,
+    project_category_main: str | None = None,
+    material: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int = Query(5000, ge=1, le=50000),
+    db: Session = Depends(get_db),
+):
+    """
+    Total forecasted quantity and cost per material, optionally broken down by
+    state / category / month. Returned as a compact pivot: column names once,
+    then one list per group. At most `limit` groups are returned; hasMore is
+    true when more groups matched, so totals are never silently partial.
+    """
+    where = []
+    if state:
+        where.append(lambda M: Forecast.state == state)
+    if project_category_main:
+        where.append(lambda M: Forecast.project_category_main == project_category_main)
+    if material:
+        where.append(lambda M: M.material_name == material)
+    if date_from:
+        where.append(lambda M: Forecast.created_at >= date_from)
+    if date_to:
+        where.append(lambda M: Forecast.created_at < date_to)
+
+    # legacy per-forecast rows + shared content-addressed results
+    rows_sq = forecast_store.material_rows(
+        Forecast.state, Forecast.project_category_main, Forecast.created_at, where=where
+    )
+    dimensions = {
+        "state": rows_sq.c.state,
+        "category": rows_sq.c.project_category_main,
+        "month": _month_expr(rows_sq.c.created_at),
+    }
+    keys = ["material"] + [g for g in dict.fromkeys(group_by)]
+    group_cols = [rows_sq.c.material_name] + [dimensions[g] for g in keys[1:]]
+
+    query = db.query(
+        *group_cols,
+        func.sum(rows_sq.c.predicted_qty),
+        func.sum(rows_sq.c.total_cost),
+        func.count(func.distinct(rows_sq.c.forecast_id)),
+    )
+
+    rows = query.group_by(*group_cols).order_by(*group_cols).limit(limit + 1).all()
+
+    return {
+        "groupBy": keys,
+        "columns": keys + ["quantity", "cost", "forecasts"],
+        "rows": [
+            [*row[:-3], float(row[-3] or 0), float(row[-2] or 0), int(row[-1])]
+            for row in rows[:limit]
+        ],
+        "hasMore": len(rows) > limit,
+    }
+
+
+# ======================================================================================
+# 4️⃣ PRICE CATALOG + RE-COSTING of saved forecasts (no model calls)
+# ======================================================================================
+@router.get("/prices")
+def get_prices():
+    prices = price_catalog.current()
+    return {"version": prices.version, "gstRate": price_catalog.GST_RATE, "prices": prices.by_name}
+
+
+@router.post("/prices", dependencies=[Depends(require_admin)])
+def publish_prices(body: PricePublish, db: Session = Depends(get_db)):
+    """Publish a new catalog version; unspecified materials keep their current price."""
+    unknown = sorted(set(body.prices) - set(price_catalog.MATERIAL_NAMES) - set(price_catalog.DEFAULT_UNIT_PRICES))
+    if unknown:
+        raise HTTPException(400, f"Unknown materials: {', '.join(unknown[:10])}")
+    prices = price_catalog.publish(db, body.prices, note=body.note)
+    return {"version": prices.version, "prices": prices.by_name}
+
+
+def _reprice_rows(db, table, owner_col, owners, version: int) -> int:
+    """Set unit_cost/total_cost of material rows from catalog `version` (one UPDATE)."""
+    new_unit_cost = (
+        select(PriceCatalogItem.unit_price)
+        .where(
+            PriceCatalogItem.version_id == version,
+            PriceCatalogItem.material_name == table.material_name,
+        )
+        .scalar_subquery()
+    )
+    unit_cost = func.coalesce(new_unit_cost, table.unit_cost, 0)
+    return db.execute(
+        update(table)
+        .where(owner_col.in_(owners))
+        .values(unit_cost=unit_cost, total_cost=table.predicted_qty * unit_cost)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _totals_from(subtotal, version: int) -> dict:
+    return {
+        "subtotal": subtotal,
+        "gst": subtotal * price_catalog.GST_RATE,
+        "total": subtotal * (1 + price_catalog.GST_RATE),
+        "price_version": version,
+    }
+
+
+@router.post("/recost", dependencies=[Depends(require_admin)])
+def recost_forecasts(only_stale: bool = True, db: Session = Depends(get_db)):
+    """
+    Re-price stored forecasts with the active catalog version using set-based
+    UPDATEs (material rows, then totals). Quantities are reused; shared
+    results are re-priced once for all forecasts that reference them.
+    """
+    started = time.perf_counter()
+    prices = price_catalog.ensure_published(db)
+    version = prices.version
+
+    def stale(column):
+        return or_(column.is_(None), column != version) if only_stale else true()
+
+    # shared results: materials, then result totals
+    results = select(ForecastResult.id).where(stale(ForecastResult.price_version))
+    materials_updated = _reprice_rows(db, ForecastResultMaterial, ForecastResultMaterial.result_id, results, version)
+    result_subtotal = func.coalesce(
+        select(func.sum(ForecastResultMaterial.total_cost))
+        .where(ForecastResultMaterial.result_id == ForecastResult.id)
+        .scalar_subquery(),
+        0,
+    )
+    db.execute(
+        update(ForecastResult)
+        .where(stale(ForecastResult.price_version))
+        .values(**_totals_from(result_subtotal, version))
+        .execution_options(synchronize_session=False)
+    )
+
+    # legacy forecasts with their own forecast_materials rows
+    legacy = select(Forecast.id).where(Forecast.result_id.is_(None), stale(Forecast.price_version))
+    materials_updated += _reprice_rows(db, ForecastMaterial, ForecastMaterial.forecast_id, legacy, version)
+    legacy_subtotal = func.coalesce(
+        select(func.sum(ForecastMaterial.total_cost))
+        .where(ForecastMaterial.forecast_id == Forecast.id)
+        .scalar_subquery(),
+        0,
+    )
+    forecasts_updated = db.execute(
+        update(Forecast)
+        .where(Forecast.result_id.is_(None), stale(Forecast.price_version))
+        .values(**_totals_from(legacy_subtotal, version))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # result-backed forecasts copy their (re-priced) result totals
+    def from_result(column):
+        return select(column).where(ForecastResult.id == Forecast.result_id).scalar_subquery()
+
+    forecasts_updated += db.execute(
+        update(Forecast)
+        .where(Forecast.result_id.is_not(None), stale(Forecast.price_version))
+        .values(
+            subtotal=from_result(ForecastResult.subtotal),
+            gst=from_result(ForecastResult.gst),
+            total=from_result(ForecastResult.total),
+            price_version=version,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    response_cache.invalidate(response_cache.FORECASTS)
+    events.publish("forecasts.recosted", {"version": version, "forecastsUpdated": forecasts_updated})
+
+    return {
+        "version": version,
+        "forecastsUpdated": forecasts_updated,
+        "materialsUpdated": materials_updated,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ======================================================================================
+# 5️⃣ ACCURACY BACKFILL — incremental, only forecasts whose actuals changed
+# ======================================================================================
+@router.post("/accuracy/backfill")
+def backfill_accuracy(
+    sync_materials: bool = True,
+    actuals: UploadFile | None = File(None),
+    db: Session = Depends(get_db),
+):
+    imported = 0
+    if actuals is not None:
+        imported = accuracy_backfill.import_actuals(
+            db, io.TextIOWrapper(actuals.file, encoding="utf-8", newline="")
+        )
+    result = accuracy_backfill.run(db, sync_materials=sync_materials)
+    return {"imported": imported, **result}
+
+
+# ======================================================================================
+# 6️⃣ BATCH PREDICT — optional NDJSON streaming, one line per project
+# ======================================================================================
+def _batch_lines(rows: list[ForecastInput], chunk_size: int):
+    """
+    Header line (material names + price version), one result line per input
+    row as each chunk is predicted and costed, then an end line.
+    """
+    started = time.perf_counter()
+    prices = price_catalog.current()
+    yield {
+        "type": "header",
+        "count": len(rows),
+        "materials": price_catalog.MATERIAL_NAMES,
+        "priceVersion": prices.version,
+    }
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            quantities = inference.predict(
+                [r.model_dump(include=set(inference.INPUT_FEATURES)) for r in chunk]
+            )
+        except Exception as exc:
+            yield {"type": "error", "index": start, "detail": str(exc)}
+            return
+        line_totals, subtotal, gst, total = prices.cost(quantities)
+        for i, row in enumerate(chunk):
+            yield {
+                "type": "result",
+                "index": start + i,
+                "projectName": row.project_name,
+                "location": row.location,
+                "quantities": quantities[i].tolist(),
+                "lineTotals": line_totals[i].tolist(),
+                "subtotal": float(subtotal[i]),
+                "gst": float(gst[i]),
+                "total": float(total[i]),
+            }
+    yield {"type": "end", "count": len(rows), "seconds": round(time.perf_counter() - started, 3)}
+
+
+@router.post("/batch")
+def predict_batch(
+    rows: list[ForecastInput],
+    request: Request,
+    stream: bool = False,
+    chunk_size: int = Query(256, ge=1, le=5000),
+):
+    """
+    Predict + cost many projects. With stream=true (or Accept: application/x-ndjson)
+    results are sent as NDJSON while later chunks are still being predicted.
+    """
+    # admission first: a rejected request must not pay for the model cold load
+    check(request, "forecast_batch", cost=max(1, len(rows)))
+    model, _ = inference.load()
+    if model is None:
+        raise HTTPException(500, "ML model not loaded")
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            (json.dumps(line) + "\n" for line in _batch_lines(rows, chunk_size)),
+            media_type="application/x-ndjson",
+        )
+
+    lines = list(_batch_lines(rows, chunk_size))
+    errors = [line for line in lines if line["type"] == "error"]
+    if errors:
+        raise HTTPException(500, errors[0]["detail"])
+    return {
+        "materials": lines[0]["materials"],
+        "priceVersion": lines[0]["priceVersion"],
+        "results": [line for line in lines if line["type"] == "result"],
+    }
+
+
+# ======================================================================================
+# 7️⃣ ARCHIVE — move old forecasts to compressed monthly partitions
+# ======================================================================================
+@router.post("/archive", dependencies=[Depends(require_admin)])
+def archive_forecasts(
+    older_than_days: int = Query(archive.ARCHIVE_AFTER_DAYS, ge=1),
+    db: Session = Depends(get_db),
+):
+    return archive.archive_old(db, older_than_days)
+
+
 @router.get("", response_model=list[ForecastResponse])
-def list_forecasts(db: Session = Depends(get_db)):
-    return db.query(Forecast).all()
+def list_forecasts(include_archived: bool = False, db: Session = Depends(get_db)):
+    forecasts = db.query(Forecast).all()
+    if not include_archived:
+        return forecasts
+    return forecasts + list(archive.read_archived(exclude_ids={f.id for f in forecasts}))
@@ -1,12 +1,25 @@
 # routes/material_routes.py
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Material
-from schemas import MaterialCreate, MaterialResponse
+from models import Material, MaterialThreshold
+from schemas import (
+    MaterialCreate,
+    MaterialResponse,
+    MaterialThresholdCreate,
+    MaterialThresholdResponse,
+)
+import events
+import response_cache
 
 router = APIRouter(prefix="/materials", tags=["Materials"])
 
+_material_list = TypeAdapter(list[MaterialResponse])
+
 
 @router.post("/create", response_model=MaterialResponse)
 def create_material(material: MaterialCreate, db: Session = Depends(get_db)):
@@ -19,28 +32,145 @@ def create_material(material: MaterialCreate, db: Session = Depends(get_db)):
     db.add(new_mat)
     db.commit()
     db.refresh(new_mat)
+    response_cache.invalidate(response_cache.materials(new_mat.project_id))
+
+    # delta + the project's new totals (covered by ix_materials_project);
+    # skip the totals query when no dashboard is listening
+    if events.listening():
+        count, quantity, cost = db.query(
+            func.count(Material.id), func.sum(Material.quantity), func.sum(Material.cost)
+        ).filter(Material.project_id == new_mat.project_id).one()
+        events.publish("material.created", {
+            "id": new_mat.id,
+            "projectId": new_mat.project_id,
+            "materialName": new_mat.material_name,
+            "quantity": new_mat.quantity,
+            "cost": new_mat.cost,
+            "projectTotals": {
+                "materialCount": count,
+                "materialQuantity": float(quantity or 0),
+                "materialCost": float(cost or 0),
+            },
+        })
     return new_mat
 
 
 @router.get("/project/{project_id}", response_model=list[MaterialResponse])
 def get_materials_for_project(project_id: int, db: Session = Depends(get_db)):
-    mats = db.query(Material).filter(Material.project_id == project_id).all()
-    return mats
+    def build():
+        mats = db.query(Material).filter(Material.project_id == project_id).all()
+        return _material_list.dump_json(_material_list.validate_python(mats, from_attributes=True))
+
+    body = response_cache.get_or_build(response_cache.materials(project_id), "list", build)
+    return Response(content=body, media_type="application/json")
 
 
-# NEW: summary endpoint (dummy summary — NO Inventory model needed)
+# ------------------------------
+# SUMMARY (grouped + thresholded in SQL, paginated)
+# ------------------------------
 @router.get("/summary")
-def material_summary(db: Session = Depends(get_db)):
-    mats = db.query(Material).all()
-
-    summary = []
-    for m in mats:
-        summary.append({
-            "id": m.id,
-            "name": m.material_name,
-            "currentStock": m.quantity,   # no inventory table → we reuse quantity
-            "reorderLevel": 0,
-            "status": "Good"
-        })
+def material_summary(
+    response: Response,
+    project_id: int | None = None,
+    per_project: bool = False,
+    status: Literal["Low", "Good"] | None = None,
+    sort: Literal["name", "stock", "cost", "reorderLevel", "status"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    page: int = Query(1, ge=1),
+    limit: int | None = Query(None, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    Stock per material name (optionally per project). Reorder levels come from
+    material_thresholds; the total row count is returned in X-Total-Count.
+    Without `limit` every row is returned (the shape existing callers expect);
+    pass limit (+ page) to page through large catalogs.
+    """
+    group_cols = [Material.material_name]
+    if per_project:
+        group_cols.append(Material.project_id)
+
+    stock = (
+        select(
+            *group_cols,
+            func.min(Material.id).label("id"),
+            func.sum(Material.quantity).label("stock"),
+            func.sum(Material.cost).label("cost"),
+            func.count().label("entries"),
+        )
+        .group_by(*group_cols)
+    )
+    if project_id is not None:
+        stock = stock.where(Material.project_id == project_id)
+    stock = stock.subquery()
+
+    reorder_level = func.coalesce(MaterialThreshold.reorder_level, 0)
+    status_col = case(
+        (stock.c.stock <= reorder_level, "Low"),
+        else_="Good",
+    ).label("status")
+
+    summary = (
+        select(
+            stock,
+            reorder_level.label("reorder_level"),
+            status_col,
+        )
+        .outerjoin(MaterialThreshold, MaterialThreshold.material_name == stock.c.material_name)
+    )
+    if status:
+        summary = summary.where(status_col == status)
+    summary = summary.subquery()
+
+    response.headers["X-Total-Count"] = str(
+        db.execute(select(func.count()).select_from(summary)).scalar_one()
+    )
+
+    sort_col = {
+        "name": summary.c.material_name,
+        "stock": summary.c.stock,
+        "cost": summary.c.cost,
+        "reorderLevel": summary.c.reorder_level,
+        "status": summary.c.status,
+    }[sort]
+    sort_col = sort_col.desc() if order == "desc" else sort_col.asc()
+
+    query = select(summary).order_by(sort_col, summary.c.id)
+    if limit is not None:
+        query = query.offset((page - 1) * limit).limit(limit)
+    rows = db.execute(query).mappings()
+
+    return [
+        {
+            "id": r["id"],
+            "name": r["material_name"],
+            "projectId": r["project_id"] if per_project else project_id,
+            "currentStock": float(r["stock"] or 0),
+            "totalCost": float(r["cost"] or 0),
+            "entries": r["entries"],
+            "reorderLevel": float(r["reorder_level"]),
+            "status": r["status"],
+        }
+        for r in rows
+    ]
+
+
+@router.post("/thresholds", response_model=MaterialThresholdResponse)
+def set_material_threshold(data: MaterialThresholdCreate, db: Session = Depends(get_db)):
+    threshold = (
+        db.query(MaterialThreshold)
+        .filter(MaterialThreshold.material_name == data.material_name)
+        .first()
+    )
+    if threshold is None:
+        threshold = MaterialThreshold(material_name=data.material_name)
+        db.add(threshold)
+    threshold.reorder_level = data.reorder_level
+    db.commit()
+    db.refresh(threshold)
+    return threshold
+
 
-    return summary
+@router.get("/thresholds", response_model=list[MaterialThresholdResponse])
+def list_material_thresholds(db: Session = Depends(get_db)):
+    return db.query(MaterialThreshold).order_by(MaterialThreshold.material_name).all()
@@ -1,5 +1,12 @@
 # routes/prediction_routes.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Prediction, Project
+from schemas import CostPredictionRequest
+import ml_engine
+import prediction_rescore
+from routes.admin_routes import require_admin
 
 router = APIRouter(prefix="/predictions", tags=["Predictions"])
 
@@ -7,3 +14,86 @@ router = APIRouter(prefix="/predictions", tags=["Predictions"])
 @router.get("/ping")
 def ping_prediction():
     return {"status": "prediction routes alive"}
+
+
+def _prediction_dict(p: Prediction) -> dict:
+    return {
+        "id": p.id,
+        "projectId": p.project_id,
+        "materialCost": p.material_cost,
+        "labourCost": p.labour_cost,
+        "totalCost": p.predicted_cost,
+        "towerType": p.tower_type,
+        "substationType": p.substation_type,
+        "modelVersion": p.model_version,
+        "createdAt": p.created_at,
+    }
+
+
+# ------------------------------
+# SCORE ONE PROJECT (cost model) + SAVE
+# ------------------------------
+@router.post("/project/{project_id}")
+def predict_project_cost(
+    project_id: int,
+    body: CostPredictionRequest | None = None,
+    db: Session = Depends(get_db),
+):
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(404, "Project not found")
+    body = body or CostPredictionRequest()
+
+    inputs = {
+        "budget": project.budget,
+        "line_length": project.line_length,
+        "region": project.region,
+        "project_type": project.project_type,
+        "tower_type": body.tower_type,
+        "substation_type": body.substation_type,
+    }
+    try:
+        cost = ml_engine.predict_cost(inputs)
+    except FileNotFoundError:
+        raise HTTPException(500, "Cost model not loaded")
+
+    prediction = Prediction(
+        project_id=project.id,
+        predicted_cost=cost["total_cost"],
+        material_cost=cost["material_cost"],
+        labour_cost=cost["labour_cost"],
+        tower_type=body.tower_type,
+        substation_type=body.substation_type,
+        model_version=ml_engine.model_version(),
+    )
+    db.add(prediction)
+    db.commit()
+    db.refresh(prediction)
+    return _prediction_dict(prediction)
+
+
+@router.get("/project/{project_id}")
+def list_project_predictions(
+    project_id: int,
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Newest first (served by ix_predictions_project_id)."""
+    rows = (
+        db.query(Prediction)
+        .filter(Prediction.project_id == project_id)
+        .order_by(Prediction.id.desc())
+        .limit(limit)
+    )
+    return [_prediction_dict(p) for p in rows]
+
+
+# ------------------------------
+# RE-SCORE ALL PROJECTS (when forecast_model.pkl changed)
+# ------------------------------
+@router.post("/rescore", dependencies=[Depends(require_admin)])
+def rescore_predictions(force: bool = False, db: Session = Depends(get_db)):
+    try:
+        return prediction_rescore.run(db, force=force)
+    except FileNotFoundError:
+        raise HTTPException(500, "Cost model not loaded")
@@ -1,7 +1,113 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
-from models import Project
-from schemas import ProjectResponse
+from models import Material, Prediction, Project
 
 router = APIRouter(prefix="/projects_list", tags=["Projects List"])
+
+
+@router.get("")
+def list_projects_with_details(
+    user_id: int | None = None,
+    status: str | None = None,
+    region: str | None = None,
+    location: str | None = None,
+    q: str | None = None,
+    include_materials: bool = False,
+    cursor: int | None = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Projects with material totals, latest prediction and status in one
+    response (replaces /projects + one /materials/project/{id} per project).
+    A page costs a fixed number of queries however many projects it holds.
+    """
+    query = db.query(Project)
+    if user_id is not None:
+        query = query.filter(Project.user_id == user_id)
+    if status:
+        query = query.filter(Project.status == status)
+    if region:
+        query = query.filter(Project.region == region)
+    if location:
+        query = query.filter(Project.location == location)
+    if q:
+        query = query.filter(Project.name.ilike(f"%{q}%"))
+    if cursor is not None:
+        query = query.filter(Project.id > cursor)
+    if include_materials:
+        query = query.options(selectinload(Project.materials))
+
+    projects = query.order_by(Project.id).limit(limit + 1).all()
+    has_more = len(projects) > limit
+    projects = projects[:limit]
+    ids = [p.id for p in projects]
+
+    totals = {}
+    latest = {}
+    if ids:
+        totals = {
+            row.project_id: row
+            for row in db.query(
+                Material.project_id,
+                func.count(Material.id).label("count"),
+                func.sum(Material.quantity).label("quantity"),
+                func.sum(Material.cost).label("cost"),
+            )
+            .filter(Material.project_id.in_(ids))
+            .group_by(Material.project_id)
+        }
+        latest_ids = (
+            db.query(func.max(Prediction.id))
+            .filter(Prediction.project_id.in_(ids))
+            .group_by(Prediction.project_id)
+        )
+        latest = {
+            p.project_id: p
+            for p in db.query(Prediction).filter(Prediction.id.in_(latest_ids.scalar_subquery()))
+        }
+
+    items = []
+    for p in projects:
+        mat = totals.get(p.id)
+        pred = latest.get(p.id)
+        item = {
+            "id": p.id,
+            "user_id": p.user_id,
+            "name": p.name,
+            "region": p.region,
+            "location": p.location,
+            "budget": p.budget,
+            "lineLength": p.line_length,
+            "project_type": p.project_type,
+            "start_date": p.start_date,
+            "end_date": p.end_date,
+            "status": p.status,
+            "completion": p.completion,
+            "materialCount": mat.count if mat else 0,
+            "materialQuantity": float(mat.quantity or 0) if mat else 0.0,
+            "materialCost": float(mat.cost or 0) if mat else 0.0,
+            "latestPrediction": {
+                "id": pred.id,
+                "predictedCost": pred.predicted_cost,
+                "createdAt": pred.created_at,
+            } if pred else None,
+        }
+        if include_materials:
+            item["materials"] = [
+                {
+                    "id": m.id,
+                    "material_name": m.material_name,
+                    "quantity": m.quantity,
+                    "cost": m.cost,
+                }
+                for m in p.materials
+            ]
+        items.append(item)
+
+    return {
+        "items": items,
+        "nextCursor": ids[-1] if has_more else None,
+    }
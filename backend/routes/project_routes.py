@@ -1,12 +1,29 @@
 # routes/project_routes.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Project
 from schemas import ProjectResponse
+import events
+import response_cache
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
+_project_list = TypeAdapter(list[ProjectResponse])
+
+
+def _cached_projects(key: str, query) -> Response:
+    # serialized once per cache generation, same shape as response_model output
+    body = response_cache.get_or_build(
+        response_cache.PROJECTS,
+        key,
+        lambda: _project_list.dump_json(
+            _project_list.validate_python(query.all(), from_attributes=True), by_alias=True
+        ),
+    )
+    return Response(content=body, media_type="application/json")
+
 
 # ------------------------------
 # CREATE PROJECT
@@ -30,6 +47,12 @@ def create_project(data: dict, db: Session = Depends(get_db)):
     db.add(new_project)
     db.commit()
     db.refresh(new_project)
+    response_cache.invalidate(response_cache.PROJECTS)
+    # same shape as GET /projects rows, so the dashboard can insert it as-is
+    events.publish(
+        "project.created",
+        ProjectResponse.model_validate(new_project).model_dump(mode="json", by_alias=True),
+    )
     return new_project
 
 
@@ -39,8 +62,7 @@ def create_project(data: dict, db: Session = Depends(get_db)):
 @router.get("", response_model=list[ProjectResponse])
 def get_all_projects(db: Session = Depends(get_db)):
     """Return all projects as JSON in proper schema format."""
-    projects = db.query(Project).all()
-    return projects
+    return _cached_projects("all", db.query(Project))
 
 
 # ------------------------------
@@ -48,4 +70,4 @@ def get_all_projects(db: Session = Depends(get_db)):
 # ------------------------------
 @router.get("/user/{user_id}", response_model=list[ProjectResponse])
 def get_projects_for_user(user_id: int, db: Session = Depends(get_db)):
-    return db.query(Project).filter(Project.user_id == user_id).all()
+    return _cached_projects(f"user:{user_id}", db.query(Project).filter(Project.user_id == user_id))
@@ -0,0 +1,26 @@
+# routes/search_routes.py
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from database import get_db
+import search_index
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("")
+def search(
+    q: str = Query(..., min_length=1),
+    kind: Literal["project", "forecast"] | None = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Ranked full-text search over project / forecast names, states and locations."""
+    hits = search_index.search(db, q, kind=kind, limit=limit + 1, offset=(page - 1) * limit)
+    return {
+        "results": hits[:limit],
+        "page": page,
+        "hasMore": len(hits) > limit,
+    }
@@ -0,0 +1,311 @@
+# save_queue.py
+"""
+Write-behind persistence for /forecast/save?mode=async.
+
+Requests enqueue an already-costed forecast into a local SQLite queue file
+(committed before the response is sent, so it survives restarts) and get a
+job id back. A background writer thread drains the queue, writing many
+jobs per database transaction. Several workers can share one queue file:
+jobs are claimed with a lease, and claims of a dead worker expire.
+
+A job whose write fails for a transient reason (e.g. "database is locked")
+goes back to the queue with exponential backoff; it is only marked failed
+after MAX_ATTEMPTS tries or on an error retrying cannot fix (constraint
+violation, malformed payload).
+
+Idempotency keys are unique across live (not failed) jobs, so a key reused
+while its first job is still queued is detected before a second job exists.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+
+import events
+import response_cache
+from database import SessionLocal
+from forecast_store import forecast_event, persist_forecast
+
+QUEUE_PATH = os.getenv("SIH_SAVE_QUEUE_PATH", "save_queue.db")
+BATCH_SIZE = int(os.getenv("SIH_SAVE_QUEUE_BATCH", "200"))
+BATCH_WINDOW_SECONDS = 0.05   # linger so concurrent saves share a transaction
+LEASE_SECONDS = 60            # claimed-but-unfinished jobs are retried after this
+KEEP_FINISHED_SECONDS = 24 * 3600
+MAX_ATTEMPTS = int(os.getenv("SIH_SAVE_QUEUE_MAX_ATTEMPTS", "8"))
+MAX_BACKOFF_SECONDS = 300
+
+# retrying these cannot succeed
+PERMANENT_ERRORS = (IntegrityError, KeyError, TypeError, ValueError)
+
+_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_wakeup = threading.Event()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,          -- queued | running | done | failed
+            payload TEXT NOT NULL,
+            owner TEXT,
+            forecast_id INTEGER,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            idempotency_key TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if "next_attempt_at" not in columns:  # queue files created before retries
+        conn.execute("ALTER TABLE jobs ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+    if "idempotency_key" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN idempotency_key TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_idempotency_key ON jobs (idempotency_key)")
+    return conn
+
+
+class DuplicateKey(Exception):
+    """The idempotency key already belongs to a queued, running or done job."""
+
+    def __init__(self, job: dict):
+        super().__init__(job["jobId"])
+        self.job = job
+
+
+def enqueue(record: dict) -> str:
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    # a job replayed after a crash must not create a second forecast
+    if not record.get("idempotency_key"):
+        record["idempotency_key"] = f"job:{job_id}"
+    key = record["idempotency_key"]
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # a failed job does not hold on to its key; the client may retry
+            conn.execute("DELETE FROM jobs WHERE idempotency_key = ? AND status = 'failed'", (key,))
+            conn.execute(
+                """
+                INSERT INTO jobs (id, status, payload, idempotency_key, created_at, updated_at)
+                VALUES (?, 'queued', ?, ?, ?, ?)
+                """,
+                (job_id, json.dumps(record), key, now, now),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK")
+            raise DuplicateKey(_find_by_key(conn, key))
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    start()
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id, status, forecast_id, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {
+        "jobId": row[0],
+        "status": row[1],
+        "forecastId": row[2],
+        "error": row[3],
+        "attempts": row[4],
+        "createdAt": row[5],
+        "updatedAt": row[6],
+    }
+
+
+def _find_by_key(conn, key: str) -> dict | None:
+    row = conn.execute(
+        "SELECT id, status, forecast_id, payload FROM jobs WHERE idempotency_key = ? AND status != 'failed'",
+        (key,),
+    ).fetchone()
+    if row is None:
+        return None
+    return {"jobId": row[0], "status": row[1], "forecastId": row[2], "record": json.loads(row[3])}
+
+
+def find_by_idempotency_key(key: str) -> dict | None:
+    """The live job holding this idempotency key -> {jobId, status, forecastId, record}."""
+    if not os.path.exists(QUEUE_PATH):
+        return None
+    conn = _connect()
+    try:
+        return _find_by_key(conn, key)
+    finally:
+        conn.close()
+
+
+def _claim(conn) -> list[tuple[str, dict, int]]:
+    """Lease up to BATCH_SIZE due jobs -> [(job_id, record, attempt number)]."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'queued', owner = NULL
+            WHERE status = 'running' AND updated_at < ?
+            """,
+            (now - LEASE_SECONDS,),
+        )
+        rows = conn.execute(
+            """
+            SELECT id, payload, attempts FROM jobs
+            WHERE status = 'queued' AND next_attempt_at <= ?
+            ORDER BY created_at LIMIT ?
+            """,
+            (now, BATCH_SIZE),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            [(_OWNER, now, job_id) for job_id, _, _ in rows],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [(job_id, json.loads(payload), attempts + 1) for job_id, payload, attempts in rows]
+
+
+def _write(jobs) -> dict:
+    """Persist jobs in one transaction -> {job_id: forecast_id}."""
+    db = SessionLocal()
+    try:
+        entries = {job_id: persist_forecast(db, record) for job_id, record in jobs}
+        deltas = [forecast_event(entry) for entry in entries.values()]
+        db.commit()
+        response_cache.invalidate(response_cache.FORECASTS)
+        for delta in deltas:
+            events.publish("forecast.saved", delta)
+        return {job_id: delta["id"] for job_id, delta in zip(entries, deltas)}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _backoff(attempt: int) -> float:
+    return min(2 ** attempt, MAX_BACKOFF_SECONDS)
+
+
+def _finish(conn, done: dict, failed: dict, retry: dict):
+    now = time.time()
+    conn.executemany(
+        "UPDATE jobs SET status = 'done', forecast_id = ?, error = NULL, updated_at = ? WHERE id = ?",
+        [(forecast_id, now, job_id) for job_id, forecast_id in done.items()],
+    )
+    conn.executemany(
+        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+        [(error, now, job_id) for job_id, error in failed.items()],
+    )
+    conn.executemany(
+        """
+        UPDATE jobs SET status = 'queued', owner = NULL, error = ?, next_attempt_at = ?, updated_at = ?
+        WHERE id = ?
+        """,
+        [(error, now + _backoff(attempt), now, job_id) for job_id, (error, attempt) in retry.items()],
+    )
+
+
+def drain_once(conn=None) -> int:
+    """Write one batch of queued jobs. Returns the number of jobs handled."""
+    own_conn = conn is None
+    conn = conn or _connect()
+    try:
+        claimed = _claim(conn)
+        if not claimed:
+            return 0
+        jobs = [(job_id, record) for job_id, record, _ in claimed]
+        done, failed, retry = {}, {}, {}
+        try:
+            done = _write(jobs)
+        except Exception:
+            # isolate the bad record(s) so one failure doesn't sink the batch
+            for job_id, record, attempt in claimed:
+                try:
+                    done.update(_write([(job_id, record)]))
+                except PERMANENT_ERRORS as exc:
+                    failed[job_id] = str(exc)
+                except Exception as exc:
+                    if attempt >= MAX_ATTEMPTS:
+                        failed[job_id] = f"gave up after {attempt} attempts: {exc}"
+                    else:
+                        retry[job_id] = (str(exc), attempt)
+        _finish(conn, done, failed, retry)
+        return len(claimed)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _prune(conn):
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+        (time.time() - KEEP_FINISHED_SECONDS,),
+    )
+
+
+def _run():
+    conn = _connect()
+    last_prune = 0.0
+    while True:
+        try:
+            if drain_once(conn) < BATCH_SIZE:
+                _wakeup.wait(timeout=1.0)
+                _wakeup.clear()
+                time.sleep(BATCH_WINDOW_SECONDS)
+            if time.time() - last_prune > 3600:
+                _prune(conn)
+                last_prune = time.time()
+        except Exception as exc:
+            print("⚠️ save queue writer error:", exc)
+            time.sleep(1.0)
+
+
+def start():
+    """Start the background writer (once per process)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name="forecast-save-writer", daemon=True)
+            _writer.start()
+
+
+def has_pending() -> bool:
+    if not os.path.exists(QUEUE_PATH):
+        return False
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') LIMIT 1"
+        ).fetchone() is not None
+    finally:
+        conn.close()
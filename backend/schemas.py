@@ -62,6 +62,12 @@ class ProjectResponse(BaseModel):
         populate_by_name = True
 
 
+# ---------- COST PREDICTION ----------
+class CostPredictionRequest(BaseModel):
+    tower_type: str | None = None
+    substation_type: str | None = None
+
+
 # ---------- MATERIAL ----------
 class MaterialCreate(BaseModel):
     project_id: int
@@ -81,6 +87,20 @@ class MaterialResponse(BaseModel):
         from_attributes = True
 
 
+class MaterialThresholdCreate(BaseModel):
+    material_name: str
+    reorder_level: float = Field(ge=0)
+
+
+class MaterialThresholdResponse(BaseModel):
+    id: int
+    material_name: str
+    reorder_level: float
+
+    class Config:
+        from_attributes = True
+
+
 # ---------- FORECAST INPUT (for Swagger + ML) ----------
 class ForecastInput(BaseModel):
     project_category_main: str
@@ -94,6 +114,12 @@ class ForecastInput(BaseModel):
     project_name: str
 
 
+# ---------- PRICE CATALOG ----------
+class PricePublish(BaseModel):
+    prices: dict[str, float]
+    note: str | None = None
+
+
 # ---------- FORECAST RESPONSE ----------
 class ForecastResponse(BaseModel):
     id: int
@@ -0,0 +1,146 @@
+# search_index.py
+"""
+Full-text search over projects and forecasts.
+
+SQLite: an FTS5 table `search_index` kept in sync by triggers on `projects`
+and `forecasts`, so every write path (routes, queue writer, archival)
+updates it inside the same transaction. rowid = id * 2 + kind, which keeps
+trigger deletes/updates to a single rowid lookup.
+
+PostgreSQL: GIN indexes over to_tsvector() expressions on both tables; the
+indexes follow writes by themselves.
+
+Indexed fields: projects.name/region/location, forecasts.project_name/state/location.
+"""
+import re
+
+from sqlalchemy import text
+
+KINDS = {"project": 0, "forecast": 1}
+
+# (table, kind, name column, state column, location column)
+_SOURCES = [
+    ("projects", "project", "name", "region", "location"),
+    ("forecasts", "forecast", "project_name", "state", "location"),
+]
+
+
+def _sqlite_ddl() -> list[str]:
+    ddl = [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED, ref_id UNINDEXED, name, state, location,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """
+    ]
+    for table, kind, name, state, location in _SOURCES:
+        code = KINDS[kind]
+        values = f"new.id * 2 + {code}, '{kind}', new.id, new.{name}, new.{state}, new.{location}"
+        insert = f"INSERT INTO search_index (rowid, kind, ref_id, name, state, location) VALUES ({values});"
+        remove = f"DELETE FROM search_index WHERE rowid = old.id * 2 + {code};"
+        ddl += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN {remove} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {name}, {state}, {location} ON {table} "
+            f"BEGIN {remove} {insert} END",
+        ]
+    return ddl
+
+
+def _pg_document(name, state, location) -> str:
+    return f"to_tsvector('simple', coalesce({name}, '') || ' ' || coalesce({state}, '') || ' ' || coalesce({location}, ''))"
+
+
+def _pg_ddl() -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({_pg_document(name, state, location)})"
+        for table, _, name, state, location in _SOURCES
+    ]
+
+
+def ensure(bind):
+    """Create the index + sync machinery (idempotent) and backfill it when new."""
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        if dialect == "sqlite":
+            created = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")
+            ).first() is None
+            for statement in _sqlite_ddl():
+                conn.execute(text(statement))
+            if created:
+                _rebuild_sqlite(conn)
+        elif dialect == "postgresql":
+            for statement in _pg_ddl():
+                conn.execute(text(statement))
+
+
+def _rebuild_sqlite(conn):
+    conn.execute(text("DELETE FROM search_index"))
+    for table, kind, name, state, location in _SOURCES:
+        conn.execute(text(
+            f"INSERT INTO search_index (rowid, kind, ref_id, name, state, location) "
+            f"SELECT id * 2 + {KINDS[kind]}, '{kind}', id, {name}, {state}, {location} FROM {table}"
+        ))
+
+
+def rebuild(bind):
+    if bind.dialect.name == "sqlite":
+        with bind.begin() as conn:
+            _rebuild_sqlite(conn)
+
+
+def _terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())
+
+
+def search(db, q: str, kind: str | None = None, limit: int = 20, offset: int = 0) -> list[dict]:
+    terms = _terms(q)
+    if not terms:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        return _search_pg(db, terms, kind, limit, offset)
+
+    # every term must match; the last one as a prefix (search-as-you-type)
+    match = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+    sql = (
+        "SELECT kind, ref_id, name, state, location, bm25(search_index) AS rank "
+        "FROM search_index WHERE search_index MATCH :match"
+        + (" AND kind = :kind" if kind else "")
+        + " ORDER BY rank LIMIT :limit OFFSET :offset"
+    )
+    rows = db.execute(
+        text(sql), {"match": match.strip(), "kind": kind, "limit": limit, "offset": offset}
+    ).mappings()
+    return [_hit(r, -r["rank"]) for r in rows]
+
+
+def _search_pg(db, terms, kind, limit, offset) -> list[dict]:
+    query = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    branches = []
+    for table, source_kind, name, state, location in _SOURCES:
+        if kind and kind != source_kind:
+            continue
+        doc = _pg_document(name, state, location)
+        branches.append(
+            f"SELECT '{source_kind}' AS kind, id AS ref_id, {name} AS name, {state} AS state, "
+            f"{location} AS location, ts_rank({doc}, q) AS rank "
+            f"FROM {table}, to_tsquery('simple', :query) q WHERE {doc} @@ q"
+        )
+    sql = " UNION ALL ".join(branches) + " ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+    rows = db.execute(text(sql), {"query": query, "limit": limit, "offset": offset}).mappings()
+    return [_hit(r, r["rank"]) for r in rows]
+
+
+def _hit(row, score) -> dict:
+    # raw relevance, higher is better (negated bm25 / ts_rank); bm25 values for
+    # common terms are ~1e-6, so rounding would flatten the ranking
+    return {
+        "kind": row["kind"],
+        "id": row["ref_id"],
+        "name": row["name"],
+        "state": row["state"],
+        "location": row["location"],
+        "score": float(score),
+    }
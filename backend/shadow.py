@@ -0,0 +1,195 @@
+# shadow.py
+"""
+Shadow evaluation of a candidate material model on live traffic.
+
+When SIH_SHADOW_MODEL_PATH is set, sampled /forecast/predict and
+/forecast/save inputs are replayed against the candidate on a background
+executor and the per-material deltas against the primary output are stored
+in `shadow_evaluations`. Submission never blocks: past SIH_SHADOW_QUEUE_MAX
+in-flight evaluations new work is dropped (and counted), and every failure
+is swallowed, so the primary response is unaffected.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import inference
+import price_catalog
+
+SHADOW_MODEL_PATH = os.getenv("SIH_SHADOW_MODEL_PATH")
+SHADOW_SCALER_PATH = os.getenv("SIH_SHADOW_SCALER_PATH", inference.SCALER_PATH)
+SAMPLE_RATE = float(os.getenv("SIH_SHADOW_SAMPLE_RATE", "1.0"))
+QUEUE_MAX = int(os.getenv("SIH_SHADOW_QUEUE_MAX", "32"))
+WORKERS = int(os.getenv("SIH_SHADOW_WORKERS", "1"))
+
+ENABLED = bool(SHADOW_MODEL_PATH)
+
+_executor = None
+_slots = threading.BoundedSemaphore(QUEUE_MAX)
+_lock = threading.Lock()        # counters + executor creation; never held during I/O
+_load_lock = threading.Lock()
+_model = None
+_y_scaler = None
+_loaded = False
+_stats = {"submitted": 0, "sampledOut": 0, "dropped": 0, "recorded": 0, "failed": 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+    return {
+        "enabled": ENABLED,
+        "modelPath": SHADOW_MODEL_PATH,
+        "sampleRate": SAMPLE_RATE,
+        "queueMax": QUEUE_MAX,
+        **snapshot,
+    }
+
+
+def version() -> str:
+    return inference.fingerprint(SHADOW_MODEL_PATH, SHADOW_SCALER_PATH)
+
+
+def _load():
+    global _model, _y_scaler, _loaded
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                import joblib
+
+                try:
+                    _model = joblib.load(SHADOW_MODEL_PATH)
+                    _y_scaler = joblib.load(SHADOW_SCALER_PATH)
+                    print("✅ Shadow Model Loaded")
+                except Exception:
+                    _model, _y_scaler = None, None
+                    print("⚠️ SHADOW MODEL LOAD FAILED — Check SIH_SHADOW_MODEL_PATH")
+                _loaded = True
+    return _model, _y_scaler
+
+
+def submit(source: str, features: dict, primary) -> bool:
+    """
+    Queue one shadow evaluation. `primary` is the primary model's quantity
+    vector for the same input. Returns whether the work was accepted.
+    """
+    global _executor
+    if not ENABLED:
+        return False
+    if SAMPLE_RATE < 1.0 and random.random() >= SAMPLE_RATE:
+        _count("sampledOut")
+        return False
+    if not _slots.acquire(blocking=False):
+        _count("dropped")
+        return False
+
+    import numpy as np
+
+    primary = np.array(primary, dtype=np.float32)  # own copy, the caller may reuse theirs
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="shadow")
+    try:
+        _executor.submit(_run, source, dict(features), primary, inference.model_version())
+    except RuntimeError:  # interpreter shutting down
+        _slots.release()
+        return False
+    _count("submitted")
+    return True
+
+
+def _run(source, features, primary, primary_version):
+    try:
+        _evaluate(source, features, primary, primary_version)
+        _count("recorded")
+    except Exception as exc:
+        _count("failed")
+        print("⚠️ Shadow evaluation failed:", exc)
+    finally:
+        _slots.release()
+
+
+def _evaluate(source, features, primary, primary_version):
+    import numpy as np
+    from database import SessionLocal
+    from models import ShadowEvaluation
+
+    model, y_scaler = _load()
+    if model is None:
+        raise RuntimeError("shadow model not loaded")
+
+    start = time.perf_counter()
+    shadow = inference.predict_with(model, y_scaler, [features])[0].astype(np.float32)
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    deltas = shadow - primary
+    abs_deltas = np.abs(deltas)
+    worst = int(abs_deltas.argmax())
+    prices = price_catalog.current()
+
+    db = SessionLocal()
+    try:
+        db.add(ShadowEvaluation(
+            source=source,
+            shadow_version=version(),
+            primary_version=primary_version,
+            mae=float(abs_deltas.mean()),
+            max_abs_delta=float(abs_deltas[worst]),
+            max_delta_material=price_catalog.MATERIAL_NAMES[worst],
+            primary_total=float(prices.cost(primary)[3]),
+            shadow_total=float(prices.cost(shadow)[3]),
+            deltas=deltas.tobytes(),
+            latency_ms=round(latency_ms, 3),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def summary(db, shadow_version: str | None = None, limit: int = 1000, top: int = 10) -> dict:
+    """Aggregate the most recent `limit` evaluations (of one shadow version)."""
+    import numpy as np
+    from models import ShadowEvaluation
+
+    query = db.query(ShadowEvaluation)
+    if shadow_version:
+        query = query.filter(ShadowEvaluation.shadow_version == shadow_version)
+    rows = query.order_by(ShadowEvaluation.id.desc()).limit(limit).all()
+    if not rows:
+        return {"count": 0, "stats": stats(), "materials": []}
+
+    deltas = np.vstack([np.frombuffer(r.deltas, dtype=np.float32) for r in rows])
+    mean_abs = np.abs(deltas).mean(axis=0)
+    bias = deltas.mean(axis=0)
+    order = np.argsort(mean_abs)[::-1][:top]
+    total_deltas = np.array([
+        (r.shadow_total or 0.0) - (r.primary_total or 0.0) for r in rows
+    ])
+
+    return {
+        "count": len(rows),
+        "shadowVersions": sorted({r.shadow_version for r in rows}),
+        "mae": float(np.mean([r.mae for r in rows])),
+        "maxAbsDelta": float(max(r.max_abs_delta for r in rows)),
+        "meanTotalDelta": float(total_deltas.mean()),
+        "p50LatencyMs": float(np.median([r.latency_ms or 0.0 for r in rows])),
+        "from": rows[-1].created_at,
+        "to": rows[0].created_at,
+        "stats": stats(),
+        "materials": [
+            {
+                "name": price_catalog.MATERIAL_NAMES[i],
+                "meanAbsDelta": float(mean_abs[i]),
+                "meanDelta": float(bias[i]),
+            }
+            for i in order
+        ],
+    }
@@ -0,0 +1,113 @@
+# startup_profile.py
+"""
+Startup profiling for the API process.
+
+    python startup_profile.py report [--top 25]
+        -X importtime breakdown of `import app` (slowest modules first).
+
+    python startup_profile.py bench [--runs 7] [--max-ms 1500] [--baseline startup_baseline.json]
+        Cold-start regression check: imports `app` in fresh interpreters and
+        fails (exit 1) if the median exceeds --max-ms, regresses more than
+        --tolerance against the saved baseline, or if the ML stack got
+        imported on the boot path. --update-baseline stores the new median.
+
+Run from the backend folder.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# must not be imported while booting; they load lazily on first prediction
+HEAVY_MODULES = ("pandas", "sklearn", "joblib", "scipy")
+
+_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import app\n"
+    "elapsed = (time.perf_counter() - t) * 1000\n"
+    f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+    "print(json.dumps({'ms': elapsed, 'heavy': heavy}))\n"
+)
+
+
+def _run_probe(extra_args=()):
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
+
+
+def report(top: int):
+    proc = _run_probe(["-X", "importtime"])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(f"import app: {probe['ms']:.0f} ms")
+    print(f"heavy modules loaded at boot: {', '.join(probe['heavy']) or 'none'}\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+def bench(runs: int, max_ms: float, baseline: str, tolerance: float, update_baseline: bool) -> int:
+    samples, heavy = [], set()
+    for _ in range(runs):
+        probe = json.loads(_run_probe().stdout.strip().splitlines()[-1])
+        samples.append(probe["ms"])
+        heavy.update(probe["heavy"])
+
+    median = statistics.median(samples)
+    print(f"import app over {runs} cold runs: median {median:.0f} ms, min {min(samples):.0f} ms, max {max(samples):.0f} ms")
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at boot: {', '.join(sorted(heavy))}")
+    if median > max_ms:
+        failures.append(f"median {median:.0f} ms exceeds budget {max_ms:.0f} ms")
+    if baseline and os.path.exists(baseline) and not update_baseline:
+        with open(baseline) as fh:
+            previous = json.load(fh)["median_ms"]
+        if median > previous * (1 + tolerance):
+            failures.append(f"median {median:.0f} ms regressed >{tolerance:.0%} vs baseline {previous:.0f} ms")
+    if baseline and update_baseline:
+        with open(baseline, "w") as fh:
+            json.dump({"median_ms": round(median, 1), "runs": runs}, fh, indent=2)
+        print(f"baseline written to {baseline}")
+
+    for failure in failures:
+        print("❌", failure)
+    if not failures:
+        print("✅ startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile / benchmark API startup")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_report = sub.add_parser("report", help="import-time profile of `import app`")
+    p_report.add_argument("--top", type=int, default=25)
+
+    p_bench = sub.add_parser("bench", help="cold-start regression benchmark")
+    p_bench.add_argument("--runs", type=int, default=7)
+    p_bench.add_argument("--max-ms", type=float, default=1500)
+    p_bench.add_argument("--baseline", default="startup_baseline.json")
+    p_bench.add_argument("--tolerance", type=float, default=0.25)
+    p_bench.add_argument("--update-baseline", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "report":
+        report(args.top)
+    else:
+        sys.exit(bench(args.runs, args.max_ms, args.baseline, args.tolerance, args.update_baseline))
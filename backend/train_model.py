@@ -0,0 +1,320 @@
+# train_model.py
+"""
+Offline retraining of the material model + target scaler.
+
+Training rows are streamed from the DB in keyset-paginated chunks of
+forecasts. A forecast's target vector is its stored material quantities
+(forecast_materials or the shared forecast result), with every material
+that has a recorded actual (forecast_actuals) replaced by the actual. By
+default only forecasts with at least one actual are used; --all-forecasts
+adds the rest, whose targets are just the current model's own predictions
+(the report's data.actualsFraction shows how much of the training signal
+is real, with a warning below MIN_ACTUALS_FRACTION). At most --max-rows
+rows are kept in memory (uniform reservoir sample), so the history tables
+can be arbitrarily large.
+
+The pipeline (one-hot categoricals + multi-output forest, fitted on all
+cores, saved single-threaded for per-request predicts) and the
+StandardScaler over the 132 targets are written as
+
+    <out>/<version>/Balanced_Material_Model.pkl
+    <out>/<version>/Balanced_YScaler.pkl
+    <out>/<version>/report.json        holdout metrics + latency benchmark
+
+in exactly the format inference.py loads. --install copies them over the
+live artifacts (SIH_MODEL_PATH / SIH_SCALER_PATH); point
+SIH_SHADOW_MODEL_PATH at a version directory to trial it first.
+
+Run from the backend folder:  python train_model.py [--all-forecasts] [--install]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+import inference
+import price_catalog
+from database import SessionLocal
+from forecast_store import material_rows
+from models import Forecast, ForecastActual
+
+CHUNK_FORECASTS = 2000
+MIN_ACTUALS_FRACTION = 0.5   # warn when fewer target values than this are real actuals
+MODEL_FILE = os.path.basename(inference.MODEL_PATH)
+SCALER_FILE = os.path.basename(inference.SCALER_PATH)
+
+CATEGORICAL = ["project_category_main", "project_type", "state", "terrain"]
+NUMERIC = [
+    "project_budget_price_in_lake",
+    "distance_from_storage_unit",
+    "transmission_line_length_km",
+]
+
+_MATERIAL_INDEX = {name: i for i, name in enumerate(price_catalog.MATERIAL_NAMES)}
+
+
+# ---------------------------------------------------------------- data
+def iter_chunks(db, actuals_only: bool = True, chunk_size: int = CHUNK_FORECASTS):
+    """Yield (feature rows, float32 target matrix, actuals per row) per chunk of forecasts."""
+    n_materials = len(price_catalog.MATERIAL_NAMES)
+    last_id = 0
+    while True:
+        query = (
+            select(Forecast.id, *[getattr(Forecast, f) for f in inference.INPUT_FEATURES])
+            .where(Forecast.id > last_id)
+            .order_by(Forecast.id)
+            .limit(chunk_size)
+        )
+        if actuals_only:
+            query = query.where(
+                select(ForecastActual.id).where(ForecastActual.forecast_id == Forecast.id).exists()
+            )
+        forecasts = db.execute(query).all()
+        if not forecasts:
+            return
+        last_id = forecasts[-1][0]
+
+        ids = [f[0] for f in forecasts]
+        position = {fid: i for i, fid in enumerate(ids)}
+        targets = np.full((len(ids), n_materials), np.nan, dtype=np.float32)
+        observed = np.zeros((len(ids), n_materials), dtype=bool)
+
+        stored = material_rows(where=[lambda M: Forecast.id.in_(ids)])
+        for fid, name, qty in db.execute(
+            select(stored.c.forecast_id, stored.c.material_name, stored.c.predicted_qty)
+        ):
+            col = _MATERIAL_INDEX.get(name)
+            if col is not None and qty is not None:
+                targets[position[fid], col] = qty
+
+        for fid, name, qty in db.execute(
+            select(ForecastActual.forecast_id, ForecastActual.material_name, ForecastActual.actual_qty)
+            .where(ForecastActual.forecast_id.in_(ids))
+        ):
+            col = _MATERIAL_INDEX.get(name)
+            if col is not None and qty is not None:
+                targets[position[fid], col] = qty
+                observed[position[fid], col] = True
+
+        # forecasts without a full target vector (e.g. pre-catalog rows) are skipped
+        complete = ~np.isnan(targets).any(axis=1)
+        rows = [dict(zip(inference.INPUT_FEATURES, f[1:])) for f, ok in zip(forecasts, complete) if ok]
+        yield rows, targets[complete], observed[complete].sum(axis=1)
+
+
+class Reservoir:
+    """Uniform sample of at most `capacity` (row, target, actuals) triples from a stream."""
+
+    def __init__(self, capacity: int, n_targets: int, seed: int = 0):
+        self.capacity = capacity
+        self.rows = []
+        self.targets = np.empty((capacity, n_targets), dtype=np.float32)
+        self.actuals = np.empty(capacity, dtype=np.int32)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, rows, targets, actuals):
+        for row, target, n_actual in zip(rows, targets, actuals):
+            if self.seen < self.capacity:
+                slot = self.seen
+                self.rows.append(row)
+            else:
+                slot = self._rng.integers(0, self.seen + 1)
+                if slot < self.capacity:
+                    self.rows[slot] = row
+            if slot < self.capacity:
+                self.targets[slot] = target
+                self.actuals[slot] = n_actual
+            self.seen += 1
+
+    def arrays(self):
+        n = len(self.rows)
+        return self.rows, self.targets[:n], self.actuals[:n]
+
+
+# ---------------------------------------------------------------- model
+def build_pipeline(estimator: str, n_estimators: int, seed: int):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    forest = {"rf": RandomForestRegressor, "extratrees": ExtraTreesRegressor}[estimator]
+    return Pipeline([
+        ("features", ColumnTransformer(
+            [
+                ("categorical", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL),
+                ("numeric", "passthrough", NUMERIC),
+            ],
+            remainder="drop",   # features_frame() also carries the legacy column name
+        )),
+        ("model", forest(n_estimators=n_estimators, n_jobs=-1, random_state=seed)),
+    ])
+
+
+def evaluate(model, y_scaler, rows, targets) -> dict:
+    if not rows:
+        return {"rows": 0}
+    predicted = inference.predict_with(model, y_scaler, rows)
+    error = np.abs(predicted - targets)
+    per_material = error.mean(axis=0)
+    worst = np.argsort(per_material)[::-1][:10]
+    ss_res = ((predicted - targets) ** 2).sum(axis=0)
+    ss_tot = ((targets - targets.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan)
+    return {
+        "rows": len(rows),
+        "mae": float(error.mean()),
+        "meanR2": float(np.nanmean(r2)) if not np.isnan(r2).all() else None,
+        "worstMaterials": [
+            {"name": price_catalog.MATERIAL_NAMES[i], "mae": float(per_material[i])} for i in worst
+        ],
+    }
+
+
+def benchmark(model, y_scaler, rows, runs: int = 50, batch: int = 256) -> dict:
+    """Single-row latency (p50/p95) and batch throughput of the fitted artifacts."""
+    single = []
+    for i in range(runs):
+        start = time.perf_counter()
+        inference.predict_with(model, y_scaler, [rows[i % len(rows)]])
+        single.append((time.perf_counter() - start) * 1000)
+    batch_rows = [rows[i % len(rows)] for i in range(batch)]
+    start = time.perf_counter()
+    inference.predict_with(model, y_scaler, batch_rows)
+    batch_ms = (time.perf_counter() - start) * 1000
+    return {
+        "singleP50Ms": round(float(np.percentile(single, 50)), 3),
+        "singleP95Ms": round(float(np.percentile(single, 95)), 3),
+        "batchSize": batch,
+        "batchMs": round(batch_ms, 3),
+        "rowsPerSecond": round(batch / (batch_ms / 1000), 1),
+    }
+
+
+# ---------------------------------------------------------------- driver
+def train(db, out_dir="models", max_rows=200_000, holdout=0.2, estimator="rf",
+          n_estimators=200, actuals_only=True, seed=0) -> dict:
+    import joblib
+    from sklearn.preprocessing import StandardScaler
+
+    started = time.perf_counter()
+    reservoir = Reservoir(max_rows, len(price_catalog.MATERIAL_NAMES), seed)
+    for rows, targets, actuals in iter_chunks(db, actuals_only=actuals_only):
+        reservoir.add(rows, targets, actuals)
+    rows, targets, actuals = reservoir.arrays()
+    if len(rows) < 2:
+        hint = " with recorded actuals (see accuracy_backfill.py, or pass --all-forecasts)" if actuals_only else ""
+        raise SystemExit(f"Not enough training rows ({len(rows)}) in the database{hint}")
+    actuals_fraction = float(actuals.sum()) / targets.size
+    warnings = []
+    if actuals_fraction < MIN_ACTUALS_FRACTION:
+        warnings.append(
+            f"only {actuals_fraction:.1%} of target values are recorded actuals; "
+            "the rest are the current model's predictions"
+        )
+    load_s = time.perf_counter() - started
+
+    order = np.random.default_rng(seed).permutation(len(rows))
+    n_test = int(len(rows) * holdout) if len(rows) >= 10 else 0
+    test_idx, train_idx = order[:n_test], order[n_test:]
+    train_rows = [rows[i] for i in train_idx]
+    test_rows = [rows[i] for i in test_idx]
+
+    y_scaler = StandardScaler().fit(targets[train_idx])
+    model = build_pipeline(estimator, n_estimators, seed)
+    fit_start = time.perf_counter()
+    model.fit(inference.features_frame(train_rows), y_scaler.transform(targets[train_idx]))
+    fit_s = time.perf_counter() - fit_start
+    # fitted on all cores; served one row at a time, where a per-predict
+    # joblib dispatch over every core costs more than the trees themselves
+    model.set_params(model__n_jobs=1)
+
+    digest = hashlib.sha256(targets.tobytes()).hexdigest()[:8]
+    version = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{digest}"
+    target_dir = os.path.join(out_dir, version)
+    os.makedirs(target_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(target_dir, MODEL_FILE))
+    joblib.dump(y_scaler, os.path.join(target_dir, SCALER_FILE))
+
+    report = {
+        "version": version,
+        "createdAt": datetime.utcnow().isoformat(),
+        "params": {
+            "estimator": estimator,
+            "nEstimators": n_estimators,
+            "maxRows": max_rows,
+            "holdout": holdout,
+            "actualsOnly": actuals_only,
+            "seed": seed,
+        },
+        "data": {
+            "forecastsSeen": reservoir.seen,
+            "sampled": len(rows),
+            "train": len(train_rows),
+            "test": len(test_rows),
+            "rowsWithActuals": int((actuals > 0).sum()),
+            "actualsFraction": round(actuals_fraction, 4),
+        },
+        "timings": {"loadSeconds": round(load_s, 3), "fitSeconds": round(fit_s, 3)},
+        "holdout": evaluate(model, y_scaler, test_rows, targets[test_idx]),
+        "latency": benchmark(model, y_scaler, test_rows or train_rows),
+        "artifacts": {"model": MODEL_FILE, "scaler": SCALER_FILE},
+        "warnings": warnings,
+    }
+    with open(os.path.join(target_dir, "report.json"), "w") as fh:
+        json.dump(report, fh, indent=2)
+    report["path"] = target_dir
+    return report
+
+
+def install(version_dir: str):
+    """Replace the live artifacts with a trained version (atomic per file)."""
+    for name, live in ((MODEL_FILE, inference.MODEL_PATH), (SCALER_FILE, inference.SCALER_PATH)):
+        tmp = f"{live}.tmp"
+        shutil.copyfile(os.path.join(version_dir, name), tmp)
+        os.replace(tmp, live)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the material model from saved forecasts")
+    parser.add_argument("--out", default="models", help="directory for versioned artifacts")
+    parser.add_argument("--max-rows", type=int, default=200_000, help="reservoir size (memory bound)")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--estimator", choices=["rf", "extratrees"], default="rf")
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--all-forecasts", action="store_true",
+                        help="also train on forecasts without actuals (targets = stored predictions)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--install", action="store_true", help="copy the new artifacts over the live ones")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = train(
+            db,
+            out_dir=args.out,
+            max_rows=args.max_rows,
+            holdout=args.holdout,
+            estimator=args.estimator,
+            n_estimators=args.n_estimators,
+            actuals_only=not args.all_forecasts,
+            seed=args.seed,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps({k: report[k] for k in ("version", "data", "timings", "latency")}, indent=2))
+    print("Holdout MAE:", report["holdout"].get("mae"))
+    for warning in report["warnings"]:
+        print("⚠️", warning)
+    if args.install:
+        install(report["path"])
+        print("✅ Installed", report["version"], "→", inference.MODEL_PATH)
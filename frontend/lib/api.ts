@@ -83,6 +83,25 @@ class API {
     }
   }
 
+  // Projects with material totals + latest prediction in one call (cursor paginated)
+  async getProjectsList(filters: any = {}) {
+    const url = new URL(`${BASE_URL}/projects_list`);
+    Object.keys(filters || {}).forEach(k => {
+      if (filters[k] !== undefined && filters[k] !== null) url.searchParams.set(k, String(filters[k]));
+    });
+    return await fetchJson(url.toString());
+  }
+
+  // Ranked full-text search over projects and forecasts
+  async search(q: string, kind?: 'project' | 'forecast', page = 1, limit = 20) {
+    const url = new URL(`${BASE_URL}/search`);
+    url.searchParams.set('q', q);
+    if (kind) url.searchParams.set('kind', kind);
+    url.searchParams.set('page', String(page));
+    url.searchParams.set('limit', String(limit));
+    return await fetchJson(url.toString());
+  }
+
   async getProjectById(id: string) {
     try {
       return await fetchJson(`${BASE_URL}/projects/${id}`);
@@ -181,6 +200,54 @@ class API {
     }
   }
 
+  // Batch forecast streamed as NDJSON: onLine fires for the header, every
+  // per-project result (as soon as its chunk is predicted) and the end line.
+  async streamBatchForecast(rows: any[], onLine: (line: any) => void, chunkSize = 256) {
+    const response = await fetch(`${BASE_URL}/forecast/batch?stream=true&chunk_size=${chunkSize}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+      body: JSON.stringify(rows),
+    });
+    if (!response.ok || !response.body) {
+      const txt = await response.text().catch(() => null);
+      throw new Error(txt || `Batch forecast returned ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const raw = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (raw) onLine(JSON.parse(raw));
+      }
+    }
+    if (buffer.trim()) onLine(JSON.parse(buffer));
+  }
+
+  // Live deltas (server-sent events): forecast.saved, project.created,
+  // material.created, forecasts.recosted, and resync (refetch everything).
+  // EventSource reconnects by itself and resumes from the last event id.
+  subscribeEvents(onEvent: (type: string, data: any) => void, types: string[] = []) {
+    if (typeof window === 'undefined' || typeof EventSource === 'undefined') return () => {};
+    const url = new URL(`${BASE_URL}/events`);
+    types.forEach(t => url.searchParams.append('types', t));
+    const source = new EventSource(url.toString());
+    const names = ['forecast.saved', 'project.created', 'material.created', 'forecasts.recosted', 'resync'];
+    names.forEach(name =>
+      source.addEventListener(name, (e: MessageEvent) => {
+        const msg = safeJsonParse(e.data);
+        onEvent(name, msg?.data ?? {});
+      })
+    );
+    return () => source.close();
+  }
+
   async addBackendSaveForecast(projectId: string, userInputs: any, predictions: any) {
     try {
       return await fetchJson(`${BASE_URL}/forecast/save`, {
@@ -20,8 +20,30 @@ export default function Dashboard() {
 
   useEffect(() => {
     loadDashboardData();
+
+    // pushed deltas instead of re-polling the backend
+    return api.subscribeEvents((type, data) => {
+      if (type === 'project.created') {
+        setProjects(prev => [data, ...prev]);
+        setStats(prev => prev && {
+          ...prev,
+          totalProjects: prev.totalProjects + 1,
+          activeProjects: prev.activeProjects + (data.status === 'Active' ? 1 : 0),
+          lastUpdated: new Date().toLocaleString(),
+        });
+      } else if (type === 'material.created') {
+        applyMaterialDelta(data);
+      } else if (type === 'resync') {
+        loadDashboardData();
+      }
+    }, ['project.created', 'material.created']);
   }, []);
 
+  useEffect(() => {
+    const lowStockCount = materials.filter(m => m.status === 'Low' || m.status === 'Critical').length;
+    setStats(prev => prev && prev.lowStockItems !== lowStockCount ? { ...prev, lowStockItems: lowStockCount } : prev);
+  }, [materials]);
+
   const loadDashboardData = async () => {
     try {
       const dashboardStats = await api.getDashboardStats();
@@ -43,6 +65,35 @@ export default function Dashboard() {
     }
   };
 
+  // material.created carries the new row and its project's totals: patch state locally
+  const applyMaterialDelta = (data: any) => {
+    setProjects(prev => prev.map(p => (p.id === data.projectId ? { ...p, ...data.projectTotals } : p)));
+    setMaterials(prev => {
+      if (!prev.some(m => m.name === data.materialName)) {
+        return [...prev, {
+          id: data.id,
+          name: data.materialName,
+          currentStock: data.quantity || 0,
+          totalCost: data.cost || 0,
+          entries: 1,
+          reorderLevel: 0,
+          status: (data.quantity || 0) <= 0 ? 'Low' : 'Good',
+        }];
+      }
+      return prev.map(m => {
+        if (m.name !== data.materialName) return m;
+        const currentStock = (m.currentStock || 0) + (data.quantity || 0);
+        return {
+          ...m,
+          currentStock,
+          totalCost: (m.totalCost || 0) + (data.cost || 0),
+          entries: (m.entries || 0) + 1,
+          status: currentStock <= (m.reorderLevel || 0) ? 'Low' : 'Good',
+        };
+      });
+    });
+  };
+
   const navigateTo = (path: string) => {
     router.push(path);
   };